@@ -1,18 +1,80 @@
 # -*- coding: utf-8 -*-
+import time
+_START_TIME = time.perf_counter()  # 启动计时从导入模块之前开始
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import json
 import os
-from datetime import datetime
 import threading
-import re
-import webbrowser
-from PIL import Image, ImageDraw
-import pystray
+import queue
+import itertools
+from todo_store import TodoStore
+from todo_storage import open_storage, write_json_atomic, BackgroundWriter, DataLock
+from todo_archive import TodoArchive, archive_completed
+from todo_io import import_file, export_file
+from todo_autohide import EdgeAutoHide
+from todo_search import TodoSearchIndex
+from todo_filter import TagIndex, compile_filter
+from todo_view import FontRegistry, TodoListView
 
-class DesktopTodoApp:
+class StartupTimer:
+    """记录启动各阶段耗时，设置环境变量TODO_STARTUP_TIMING=1时输出到控制台"""
+    def __init__(self, start=None, enabled=False):
+        self.enabled = enabled
+        self.start = self.last = start if start is not None else time.perf_counter()
+        self.phases = []
+    
+    def mark(self, name):
+        """结束一个阶段（从上一次mark到现在）"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+    
+    def report(self, title="启动耗时"):
+        """按 -X importtime 的样式输出：阶段耗时 | 累计耗时 | 阶段名"""
+        if not self.enabled:
+            return
+        print(f"{title}:     耗时(ms) |   累计(ms) | 阶段")
+        total = 0
+        for name, seconds in self.phases:
+            total += seconds
+            print(f"{title}: {seconds * 1000:12.1f} | {total * 1000:10.1f} | {name}")
+
+
+class GeometryScheduler:
+    """拖动、调整窗口时只记录最新的目标几何，每帧最多调用一次root.geometry"""
+    FRAME_MS = 16
+    
     def __init__(self, root):
         self.root = root
+        self.target = None
+        self.applied = None
+        self.job = None
+    
+    def request(self, geometry):
+        """记录目标（"宽x高+x+y"或"+x+y"），下一帧统一应用"""
+        self.target = geometry
+        if self.job is None:
+            self.job = self.root.after(self.FRAME_MS, self.apply)
+    
+    def apply(self):
+        self.job = None
+        if self.target is not None and self.target != self.applied:
+            self.root.geometry(self.target)
+            self.applied = self.target
+    
+    def flush(self):
+        """松开鼠标时立即应用最后一个目标，并结束本次拖动"""
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+        self.apply()
+        self.target = self.applied = None
+
+
+class DesktopTodoApp:
+    def __init__(self, root, timer=None):
+        self.root = root
+        self.timer = timer or StartupTimer()
         self.root.title("桌面待办事项")
         self.root.geometry("400x600")
         
@@ -31,6 +93,9 @@ class DesktopTodoApp:
         self.resize_start_height = 0
         self.resize_start_pos_x = 0
         self.resize_start_pos_y = 0
+        self.resize_pause_job = None
+        # 移动和调整大小时每帧最多改一次窗口几何
+        self.geometry_scheduler = GeometryScheduler(self.root)
         
         # 设置窗口置顶
         self.root.attributes('-topmost', True)
@@ -38,9 +103,22 @@ class DesktopTodoApp:
         # 数据文件路径
         self.data_file = os.path.join(os.path.dirname(__file__), "todo_data.json")
         self.config_file = os.path.join(os.path.dirname(__file__), "todo_config.json")
-        
-        # 待办事项列表
-        self.todos = []
+        self.archive = TodoArchive(os.path.join(os.path.dirname(__file__), "todo_archive"))
+        # 运行期间持有数据锁，命令行据此拒绝写入，避免两边的修改互相覆盖
+        self.data_lock = DataLock(self.data_file)
+        # 命令行的写入很快结束，稍等片刻
+        if not self.data_lock.acquire(timeout=2):
+            print("数据锁已被占用：可能有另一个桌面待办正在运行，或命令行正在写入")
+        # 全文搜索索引，第一次搜索时才建立
+        self.search = TodoSearchIndex(self.archive)
+        self.search_results = []
+        self.search_job = None
+        # 标签、分组和完成状态的id集合索引，筛选视图由它们求交集得到
+        self.tag_index = TagIndex()
+        self.active_filter = None  # 当前应用的筛选条件，None表示按分组显示
+        
+        # 待办事项数据模型
+        self.store = TodoStore()
         self.groups = ["默认分组"]  # 分组列表
         self.current_group = "默认分组"  # 当前选中的分组
         
@@ -50,7 +128,31 @@ class DesktopTodoApp:
         self.hide_threshold = 20  # 鼠标离开多少像素后隐藏
         self.close_to_tray = False  # 关闭时是否隐藏到托盘
         self.remember_choice = False  # 是否记住选择
-        self.font_size = 11  # 默认字体大小
+        self.font_size = 11  # 任务文字的字号，Ctrl+滚轮缩放
+        self.font_save_job = None
+        self.saved_filters = []  # 保存的筛选条件
+        self.csv_columns = {}  # 导入CSV时任务字段 -> 列名，未列出的字段用默认列名
+        self.storage_mode = "json"  # 数据存储模式：json / journal / sharded / sqlite
+        self.save_delay_ms = 300  # 合并写盘的时间窗口
+        self.archive_after_days = 0  # 已完成超过多少天的任务移入归档，0表示不归档
+        self.archive_page_size = 50  # 每次从归档读出的条数
+        self.row_renderer = "widgets"  # 任务行画法：widgets（控件）/ canvas（Canvas图形项）
+        # 设置环境变量TODO_RENDER_STATS=1时，每次刷新列表后输出新建控件数和改动的行数
+        self.render_stats = bool(os.environ.get("TODO_RENDER_STATS"))
+        
+        # 后台加载状态：加载完成前存储后端为None，新添加的任务先排队
+        self.storage = None
+        self.loading = True
+        self.read_only = False  # 数据加载失败时为True，本次运行不保存任何修改
+        self.pending_adds = []
+        self.load_queue = queue.Queue()
+        self.load_thread = None
+        self.startup_steps = 0
+        
+        # 当前分组已从归档读出的任务
+        self.archived_todos = []
+        self.archive_cursor = None
+        self.archive_consumed = 0
         
         # 窗口状态
         self.is_hidden = False
@@ -62,19 +164,39 @@ class DesktopTodoApp:
         self.drag_start_x = 0
         self.drag_start_y = 0
         
-        # 任务拖拽状态
+        # 任务拖拽状态：拖动中只调整预览顺序，松开时才真正移动并保存
         self.dragging_task = None
         self.drag_start_index = -1
-        
-        # 加载数据和配置
-        self.load_data()
+        self.drag_original = []   # 开始拖拽时显示的任务行
+        self.drag_preview = []    # 拖动中的预览顺序
+        self.drag_rest = []       # 排在任务后面的归档行
+        self.drag_position = -1   # 被拖任务在预览中的位置
+        self.drag_y_root = 0
+        self.drag_frame_pending = None
+        
+        # 后台写盘线程，界面线程不直接做文件IO
+        self.writer = BackgroundWriter()
+        self.writer.register("config", self._write_config)
+        self.timer.mark("窗口和状态初始化")
+        
+        # 配置文件很小，同步读取；界面外框据此立即绘制
         self.load_config()
+        self.writer.delay = self.save_delay_ms / 1000
+        self.writer.register("data", self._write_data)
+        self.timer.mark("load_config")
+        
+        # 数据在后台线程打开和解析，界面先显示出来
+        self.start_loading()
+        self.timer.mark("start_loading")
         
         # 创建UI
         self.create_ui()
+        self.timer.mark("create_ui")
         
-        # 显示待办事项
+        # 显示"加载中"
         self.refresh_todo_list()
+        self.timer.mark("refresh_todo_list")
+        self.root.after_idle(self.on_first_paint)
         
         # 绑定窗口事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -86,13 +208,17 @@ class DesktopTodoApp:
         self.root.bind("<B1-Motion>", self.on_mouse_drag)
         self.root.bind("<ButtonRelease-1>", self.on_mouse_up)
         
+        # 侧边隐藏由窗口的<Enter>/<Leave>驱动，只在鼠标停在边缘附近时查询位置
+        self.auto_hide = EdgeAutoHide(self.root, self.hide_window, self.show_window,
+                                      threshold=self.hide_threshold)
+        
         # 启动自动隐藏检查（但不自动移到边缘）
         if self.auto_hide_enabled:
             # 如果上次开启了侧边隐藏，本次启动时关闭它
             self.auto_hide_enabled = False
             self.auto_hide_var.set(False)
             self.save_config()
-            # 不启动check_auto_hide
+            # 不启动auto_hide
     
     def create_ui(self):
         # 自定义标题栏（最外层）
@@ -201,6 +327,69 @@ class DesktopTodoApp:
                  font=("微软雅黑", 9), bg="#f44336", fg="white",
                  relief=tk.FLAT, padx=5, cursor="hand2").pack(side=tk.LEFT, padx=2)
         
+        tk.Button(group_frame, text="📥", command=self.import_tasks,
+                 font=("微软雅黑", 9), bg="#FF9800", fg="white",
+                 relief=tk.FLAT, padx=5, cursor="hand2").pack(side=tk.LEFT, padx=2)
+        
+        tk.Button(group_frame, text="📤", command=self.export_tasks,
+                 font=("微软雅黑", 9), bg="#FF9800", fg="white",
+                 relief=tk.FLAT, padx=5, cursor="hand2").pack(side=tk.LEFT, padx=2)
+        
+        # 搜索框：在全部分组（含归档）中查找任务，选中结果跳到所在分组和行
+        search_frame = tk.Frame(self.root, bg="#f0f0f0")
+        search_frame.pack(fill=tk.X, padx=10)
+        
+        tk.Label(search_frame, text="🔍", font=("微软雅黑", 9), bg="#f0f0f0").pack(side=tk.LEFT)
+        
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self.on_search_changed)
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var,
+                                     font=("微软雅黑", 10), relief=tk.SOLID, bd=1)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0), ipady=2)
+        self.search_entry.bind("<Return>", self.jump_to_search_result)
+        self.search_entry.bind("<Down>", self.focus_search_results)
+        self.search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        
+        # 搜索结果只在输入了关键词时显示
+        self.search_panel = tk.Frame(self.root, bg="#f0f0f0")
+        self.search_status = tk.Label(self.search_panel, font=("微软雅黑", 8),
+                                      fg="#666", bg="#f0f0f0", anchor="w")
+        self.search_status.pack(fill=tk.X)
+        self.search_list = tk.Listbox(self.search_panel, height=6, font=("微软雅黑", 10),
+                                      activestyle="none", relief=tk.SOLID, bd=1,
+                                      selectbackground="#2196F3")
+        self.search_list.pack(fill=tk.X)
+        self.search_list.bind("<ButtonRelease-1>", self.jump_to_search_result)
+        self.search_list.bind("<Return>", self.jump_to_search_result)
+        self.search_list.bind("<Escape>", lambda e: self.search_var.set(""))
+        self.search_anchor = search_frame
+        
+        # 筛选栏：如 group:工作 #urgent is:open，可保存常用条件
+        filter_frame = tk.Frame(self.root, bg="#f0f0f0")
+        filter_frame.pack(fill=tk.X, padx=10, pady=(5, 0))
+        
+        tk.Label(filter_frame, text="🔖", font=("微软雅黑", 9), bg="#f0f0f0").pack(side=tk.LEFT)
+        
+        self.filter_var = tk.StringVar()
+        self.filter_combo = ttk.Combobox(filter_frame, textvariable=self.filter_var,
+                                        values=self.saved_filters, font=("微软雅黑", 9))
+        self.filter_combo.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        self.filter_combo.bind("<Return>", self.apply_filter)
+        self.filter_combo.bind("<<ComboboxSelected>>", self.apply_filter)
+        self.filter_combo.bind("<Escape>", lambda e: self.clear_filter())
+        
+        tk.Button(filter_frame, text="💾", command=self.save_filter,
+                 font=("微软雅黑", 9), bg="#4CAF50", fg="white",
+                 relief=tk.FLAT, padx=5, cursor="hand2").pack(side=tk.LEFT, padx=2)
+        
+        tk.Button(filter_frame, text="🗑️", command=self.delete_saved_filter,
+                 font=("微软雅黑", 9), bg="#f44336", fg="white",
+                 relief=tk.FLAT, padx=5, cursor="hand2").pack(side=tk.LEFT, padx=2)
+        
+        tk.Button(filter_frame, text="✕", command=self.clear_filter,
+                 font=("微软雅黑", 9), bg="#9E9E9E", fg="white",
+                 relief=tk.FLAT, padx=5, cursor="hand2").pack(side=tk.LEFT, padx=2)
+        
         # 输入框区域
         input_frame = tk.Frame(self.root, bg="#f0f0f0")
         input_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -230,7 +419,6 @@ class DesktopTodoApp:
         
         # Canvas用于滚动
         self.canvas = tk.Canvas(list_frame, bg="white", 
-                               yscrollcommand=scrollbar.set,
                                highlightthickness=0)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.config(command=self.canvas.yview)
@@ -238,15 +426,11 @@ class DesktopTodoApp:
         # 绑定鼠标滚轮事件
         self.canvas.bind_all("<MouseWheel>", self.on_mousewheel)
         
-        # 在Canvas中创建Frame
-        self.todo_container = tk.Frame(self.canvas, bg="white")
-        self.canvas_window = self.canvas.create_window((0, 0), 
-                                                       window=self.todo_container, 
-                                                       anchor="nw")
+        # 任务行共用的字体，缩放时只改字号
+        self.fonts = FontRegistry(self.root, self.font_size)
         
-        # 绑定配置事件
-        self.todo_container.bind("<Configure>", self.on_frame_configure)
-        self.canvas.bind("<Configure>", self.on_canvas_configure)
+        # 任务行只为可见区域创建，滚动时复用
+        self.view = TodoListView(self, self.canvas, scrollbar, self.fonts, renderer=self.row_renderer)
         
         # 统计信息
         self.stats_label = tk.Label(self.root, text="", 
@@ -254,37 +438,174 @@ class DesktopTodoApp:
                                    bg="#f0f0f0", fg="#666")
         self.stats_label.pack(fill=tk.X, padx=10, pady=(0, 10))
     
-    def on_frame_configure(self, event=None):
-        """更新滚动区域"""
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-    
-    def on_canvas_configure(self, event):
-        """调整canvas窗口宽度"""
-        self.canvas.itemconfig(self.canvas_window, width=event.width)
-    
     def on_mousewheel(self, event):
         """处理鼠标滚轮事件"""
         # 检查是否按住Ctrl键
         if event.state & 0x0004:  # Ctrl键被按下
-            # Ctrl+滚轮：调整字体大小
-            if event.delta > 0:
-                self.font_size = min(self.font_size + 1, 20)  # 最大20
-            else:
-                self.font_size = max(self.font_size - 1, 8)   # 最小8
-            
-            self.save_config()
-            self.refresh_todo_list()
+            # Ctrl+滚轮：调整字体大小，共用字体改一次字号即可，行不重建
+            if self.fonts.set_size(self.font_size + (1 if event.delta > 0 else -1)):
+                self.font_size = self.fonts.size
+                self.schedule_save_font_size()
         else:
             # 普通滚轮：滚动列表
             self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
     
+    def schedule_save_font_size(self):
+        """连续缩放时不反复写配置，停下半秒后再保存"""
+        if self.font_save_job is not None:
+            self.root.after_cancel(self.font_save_job)
+        self.font_save_job = self.root.after(500, self.save_font_size)
+    
+    def save_font_size(self):
+        self.font_save_job = None
+        self.save_config()
+    
     def toggle_topmost(self):
         """切换窗口置顶状态"""
         self.root.attributes('-topmost', self.topmost_var.get())
     
+    def on_search_changed(self, *args):
+        """输入停顿后再搜索"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(150, self.run_search)
+    
+    def run_search(self):
+        """搜索全部分组和归档，把结果列在搜索框下方"""
+        self.search_job = None
+        query = self.search_var.get().strip()
+        if not query:
+            self.search_results = []
+            self.search_panel.pack_forget()
+            return
+        self.search_panel.pack(fill=tk.X, padx=10, pady=(2, 0), after=self.search_anchor)
+        self.search_list.delete(0, tk.END)
+        if self.loading:
+            # 加载完成后会重新搜索
+            self.search_status.config(text="正在加载…")
+            return
+        
+        start = time.perf_counter()
+        # 懒加载的存储要先载入全部分组才能搜到
+        for group in self.store.group_names():
+            self.ensure_group_loaded(group)
+        try:
+            self.search_results, total = self.search.search(query)
+        except Exception as e:
+            print(f"搜索失败: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        
+        for result in self.search_results:
+            todo = result.todo
+            mark = "📦" if result.archived else ("✓" if todo.completed else "○")
+            text = todo.text.split("\n")[0]
+            if len(text) > 60:
+                text = text[:60] + "..."
+            self.search_list.insert(tk.END, f"{mark} [{todo.group}] {text}")
+        shown = f"，显示前{len(self.search_results)}条" if total > len(self.search_results) else ""
+        self.search_status.config(text=f"找到 {total} 条{shown}（{elapsed:.1f}ms）")
+    
+    def apply_filter(self, event=None):
+        """按筛选栏中的条件显示全部分组中符合的任务"""
+        query = self.filter_var.get().strip()
+        if not query:
+            self.clear_filter()
+            return
+        try:
+            todo_filter = compile_filter(query)
+        except ValueError as e:
+            messagebox.showwarning("提示", str(e))
+            return
+        self.active_filter = todo_filter
+        self.refresh_todo_list()
+    
+    def clear_filter(self):
+        """清除筛选，回到按分组显示"""
+        self.filter_var.set("")
+        if self.active_filter is not None:
+            self.active_filter = None
+            self.refresh_todo_list()
+    
+    def save_filter(self):
+        """保存当前筛选条件并应用"""
+        query = self.filter_var.get().strip()
+        if not query:
+            return
+        try:
+            compile_filter(query)
+        except ValueError as e:
+            messagebox.showwarning("提示", str(e))
+            return
+        if query not in self.saved_filters:
+            self.saved_filters.append(query)
+            self.filter_combo['values'] = self.saved_filters
+            self.save_config()
+        self.apply_filter()
+    
+    def delete_saved_filter(self):
+        """从保存的筛选条件中删除当前这一条"""
+        query = self.filter_var.get().strip()
+        if query not in self.saved_filters:
+            return
+        self.saved_filters.remove(query)
+        self.filter_combo['values'] = self.saved_filters
+        self.save_config()
+    
+    def filtered_todos(self):
+        """符合当前筛选条件的任务，按分组列表的顺序、再按组内顺序排列"""
+        # 懒加载的存储要先载入全部分组才能筛选
+        for group in self.store.group_names():
+            self.ensure_group_loaded(group)
+        ids = self.tag_index.apply(self.active_filter, self.search)
+        group_order = {group: i for i, group in enumerate(self.groups)}
+        todos = [self.store.get(todo_id) for todo_id in ids]
+        todos.sort(key=lambda todo: (group_order.get(todo.group, len(group_order)), todo.group,
+                                     self.store.index_of(todo.id)))
+        return todos
+    
+    def focus_search_results(self, event=None):
+        """在搜索框中按↓进入结果列表"""
+        if self.search_results:
+            self.search_list.focus_set()
+            self.search_list.selection_clear(0, tk.END)
+            self.search_list.selection_set(0)
+            self.search_list.activate(0)
+    
+    def jump_to_search_result(self, event=None):
+        """切换到结果所在的分组，必要时显示已完成并读出归档，再滚动到这一行"""
+        if not self.search_results:
+            return
+        selection = self.search_list.curselection()
+        result = self.search_results[selection[0] if selection else 0]
+        todo = result.todo
+        
+        if todo.group not in self.groups:
+            # 只存在于数据中的分组（例如命令行添加的）
+            self.groups.append(todo.group)
+            self.group_combo['values'] = self.groups
+        if todo.group != self.current_group:
+            self.group_var.set(todo.group)
+            self.on_group_change()
+        if (result.archived or todo.completed) and not self.show_completed:
+            self.show_completed_var.set(True)
+            self.toggle_show_completed()
+        
+        kind = "todo"
+        if result.archived:
+            kind = "archived"
+            # 按页读出归档，直到出现这条任务
+            total = self.archive.count(self.current_group)
+            while all(t.id != todo.id for t in self.archived_todos) and self.archive_consumed < total:
+                if not self.read_archived_page():
+                    break
+            self.refresh_todo_list()
+        self.view.reveal(kind, todo.id)
+    
     def toggle_show_completed(self):
         """切换显示已完成任务"""
         self.show_completed = self.show_completed_var.get()
+        self.reset_archive_view()
         self.save_config()
         self.refresh_todo_list()
     
@@ -296,9 +617,10 @@ class DesktopTodoApp:
         if self.auto_hide_enabled:
             # 移动窗口到屏幕右侧
             self.move_to_screen_edge()
-            self.check_auto_hide()
+            self.auto_hide.start()
         else:
             # 恢复窗口位置
+            self.auto_hide.stop()
             if self.is_hidden:
                 self.show_window()
     
@@ -334,11 +656,12 @@ class DesktopTodoApp:
         if self.is_dragging:
             x = event.x_root - self.drag_start_x
             y = event.y_root - self.drag_start_y
-            self.root.geometry(f"+{x}+{y}")
+            self.geometry_scheduler.request(f"+{x}+{y}")
     
     def stop_drag(self, event):
         """停止拖动"""
         self.is_dragging = False
+        self.geometry_scheduler.flush()
         # 检查是否拖到屏幕边缘
         self.check_edge_snap()
     
@@ -407,7 +730,18 @@ class DesktopTodoApp:
             if new_height > min_height:
                 new_y = self.resize_start_pos_y + dy
         
-        self.root.geometry(f"{int(new_width)}x{int(new_height)}+{int(new_x)}+{int(new_y)}")
+        self.geometry_scheduler.request(f"{int(new_width)}x{int(new_height)}+{int(new_x)}+{int(new_y)}")
+        
+        # 拖动中列表不按新宽度重新折行，鼠标停下片刻后再重排
+        self.view.defer_layout(True)
+        if self.resize_pause_job is not None:
+            self.root.after_cancel(self.resize_pause_job)
+        self.resize_pause_job = self.root.after(150, self.on_resize_pause)
+    
+    def on_resize_pause(self):
+        """调整大小时鼠标停下，按当前宽度重排列表"""
+        self.resize_pause_job = None
+        self.view.defer_layout(False)
     
     def on_mouse_up(self, event):
         """鼠标释放事件"""
@@ -415,6 +749,10 @@ class DesktopTodoApp:
             self.resizing = False
             self.resize_edge = None
             self.root.config(cursor='')
+            self.geometry_scheduler.flush()
+            if self.resize_pause_job is not None:
+                self.root.after_cancel(self.resize_pause_job)
+            self.on_resize_pause()
     
     def get_resize_edge(self, x, y):
         """检测鼠标是否在窗口边缘"""
@@ -453,19 +791,18 @@ class DesktopTodoApp:
     
     def on_window_move(self, event):
         """窗口移动事件"""
-        if not self.is_dragging:
+        # 子控件（包括每个任务行）的<Configure>也会传到这里，只处理顶层窗口的
+        if not self.is_dragging or event.widget is not self.root:
             return
         # 实时检查是否接近边缘
-        self.check_edge_snap_realtime()
+        self.check_edge_snap_realtime(event.x + event.width)
     
-    def check_edge_snap_realtime(self):
-        """实时检查边缘吸附"""
+    def check_edge_snap_realtime(self, win_right):
+        """实时检查边缘吸附（win_right取自<Configure>事件，不再查询窗口位置）"""
         screen_width = self.root.winfo_screenwidth()
-        win_x = self.root.winfo_x()
-        win_width = self.root.winfo_width()
         
         # 判断是否接近右侧边缘（50像素内）
-        if win_x + win_width >= screen_width - 50:
+        if win_right >= screen_width - 50:
             # 显示提示（可选）
             pass
     
@@ -483,7 +820,7 @@ class DesktopTodoApp:
                 self.auto_hide_enabled = True
                 self.save_config()
                 self.move_to_screen_edge()
-                self.check_auto_hide()
+                self.auto_hide.start()
         else:
             # 如果拖离边缘，关闭侧边隐藏
             if self.auto_hide_enabled:
@@ -492,6 +829,7 @@ class DesktopTodoApp:
                     self.auto_hide_var.set(False)
                     self.auto_hide_enabled = False
                     self.save_config()
+                    self.auto_hide.stop()
                     if self.is_hidden:
                         self.show_window()
     
@@ -532,53 +870,6 @@ class DesktopTodoApp:
         y = (self.root.winfo_screenheight() - window_height) // 2
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
     
-    def check_auto_hide(self):
-        """检查是否需要自动隐藏"""
-        if not self.auto_hide_enabled:
-            return
-        
-        try:
-            # 获取鼠标位置
-            mouse_x = self.root.winfo_pointerx()
-            mouse_y = self.root.winfo_pointery()
-            
-            # 获取窗口位置
-            win_x = self.root.winfo_x()
-            win_y = self.root.winfo_y()
-            win_width = self.root.winfo_width()
-            win_height = self.root.winfo_height()
-            
-            # 判断鼠标是否在窗口区域内
-            mouse_in_window = (win_x <= mouse_x <= win_x + win_width and 
-                             win_y <= mouse_y <= win_y + win_height)
-            
-            # 判断鼠标是否靠近屏幕右侧边缘（用于从隐藏状态展开）
-            screen_width = self.root.winfo_screenwidth()
-            mouse_near_edge = mouse_x >= screen_width - self.hide_threshold
-            
-            # 逻辑：
-            # 1. 如果鼠标在窗口内，保持显示状态
-            # 2. 如果鼠标不在窗口内且不靠近边缘，隐藏窗口
-            # 3. 如果鼠标靠近边缘（即使不在窗口内），展开窗口
-            
-            if mouse_in_window:
-                # 鼠标在窗口内，必须显示
-                if self.is_hidden:
-                    self.show_window()
-            elif mouse_near_edge:
-                # 鼠标靠近边缘，展开窗口
-                if self.is_hidden:
-                    self.show_window()
-            else:
-                # 鼠标既不在窗口内也不靠近边缘，隐藏窗口
-                if not self.is_hidden:
-                    self.hide_window()
-        except:
-            pass
-        
-        # 继续检查
-        self.root.after(100, self.check_auto_hide)
-    
     def hide_window(self):
         """隐藏窗口到侧边"""
         if self.is_hidden:
@@ -617,23 +908,24 @@ class DesktopTodoApp:
             messagebox.showwarning("提示", "请输入待办事项内容")
             return
         
-        todo = {
-            "id": datetime.now().timestamp(),
-            "text": task_text,
-            "completed": False,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "order": len([t for t in self.todos if t.get("group", "默认分组") == self.current_group]),
-            "group": self.current_group  # 添加分组字段
-        }
-        
-        self.todos.append(todo)
         self.task_entry.delete(0, tk.END)
+        if self.loading:
+            # 数据还没读完，加载完成后再添加
+            self.pending_adds.append((task_text, self.current_group))
+            self.refresh_todo_list()
+            return
+        self.store.add(task_text, self.current_group)
         self.save_data()
         self.refresh_todo_list()
     
     def on_group_change(self, event=None):
         """分组切换"""
         self.current_group = self.group_var.get()
+        self.ensure_group_loaded(self.current_group)
+        self.reset_archive_view()
+        # 选择分组即离开筛选视图
+        self.filter_var.set("")
+        self.active_filter = None
         self.save_config()
         self.refresh_todo_list()
     
@@ -669,6 +961,8 @@ class DesktopTodoApp:
             self.group_combo['values'] = self.groups
             self.group_var.set(name)
             self.current_group = name
+            self.ensure_group_loaded(name)
+            self.reset_archive_view()
             self.save_config()
             self.refresh_todo_list()
             dialog.destroy()
@@ -689,6 +983,8 @@ class DesktopTodoApp:
     
     def rename_group(self):
         """重命名分组"""
+        if self.loading:
+            return
         if self.current_group == "默认分组":
             messagebox.showinfo("提示", "默认分组不能重命名")
             return
@@ -716,19 +1012,27 @@ class DesktopTodoApp:
             if not new_name:
                 messagebox.showwarning("提示", "分组名称不能为空", parent=dialog)
                 return
-            if new_name in self.groups and new_name != self.current_group:
+            # 只存在于数据中的分组（例如命令行添加的）同样算已存在
+            if new_name != self.current_group and (new_name in self.groups
+                                                   or new_name in self.store.group_names()):
                 messagebox.showwarning("提示", "分组名称已存在", parent=dialog)
                 return
             
             old_name = self.current_group
+            # 懒加载模式下目标分组的任务要先载入，保存时才不会被覆盖
+            self.ensure_group_loaded(new_name)
+            # 更新所有任务的分组
+            try:
+                self.store.rename_group(old_name, new_name)
+            except ValueError as e:
+                messagebox.showerror("重命名失败", str(e), parent=dialog)
+                return
+            
             # 更新分组列表
             idx = self.groups.index(old_name)
             self.groups[idx] = new_name
-            
-            # 更新所有任务的分组
-            for todo in self.todos:
-                if todo.get("group") == old_name:
-                    todo["group"] = new_name
+            self.archive.move_group(old_name, new_name)
+            self.search.invalidate_archive()
             
             self.current_group = new_name
             self.group_combo['values'] = self.groups
@@ -754,48 +1058,103 @@ class DesktopTodoApp:
     
     def delete_group(self):
         """删除分组"""
+        if self.loading:
+            return
         if self.current_group == "默认分组":
             messagebox.showinfo("提示", "默认分组不能删除")
             return
         
         # 检查分组是否有任务
-        group_tasks = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        if group_tasks:
+        task_count = self.store.group_size(self.current_group)
+        if task_count:
             result = messagebox.askyesno("确认删除", 
-                                        f"分组'{self.current_group}'中有{len(group_tasks)}个任务\n删除后这些任务将移到'默认分组'\n\n确定要删除吗？")
+                                        f"分组'{self.current_group}'中有{task_count}个任务\n删除后这些任务将移到'默认分组'\n\n确定要删除吗？")
             if not result:
                 return
             
             # 将任务移到默认分组
-            for todo in group_tasks:
-                todo["group"] = "默认分组"
+            self.ensure_group_loaded("默认分组")
+            self.store.merge_group(self.current_group, "默认分组")
         
-        # 删除分组
+        # 删除分组（归档中的任务同样归入默认分组）
+        self.archive.move_group(self.current_group, "默认分组")
+        self.search.invalidate_archive()
         self.groups.remove(self.current_group)
         self.current_group = "默认分组"
+        self.ensure_group_loaded(self.current_group)
+        self.reset_archive_view()
         self.group_combo['values'] = self.groups
         self.group_var.set(self.current_group)
         self.save_data()
         self.save_config()
         self.refresh_todo_list()
     
+    def import_tasks(self):
+        """从JSON Lines/CSV/Markdown清单批量导入任务"""
+        if self.loading:
+            return
+        if self.read_only:
+            messagebox.showwarning("提示", "数据加载失败，当前为只读模式，不能导入")
+            return
+        path = filedialog.askopenfilename(
+            title="导入任务",
+            filetypes=[("任务文件", "*.jsonl *.ndjson *.csv *.md *.markdown *.txt"),
+                       ("所有文件", "*.*")])
+        if not path:
+            return
+        groups_before = len(self.groups)
+        
+        def on_group(group):
+            self.ensure_group_loaded(group)
+            if group not in self.groups:
+                self.groups.append(group)
+        
+        try:
+            # 每批只登记变更，写盘交给后台线程合并
+            result = import_file(self.store, path, columns=self.csv_columns,
+                                 default_group=self.current_group, on_group=on_group,
+                                 on_batch=lambda: self.storage.record(self.store))
+        except Exception as e:
+            print(f"导入任务失败: {e}")
+            messagebox.showerror("导入失败", str(e))
+            return
+        
+        if len(self.groups) != groups_before:
+            self.group_combo['values'] = self.groups
+            self.save_config()
+        self.save_data()
+        self.refresh_todo_list()
+        messagebox.showinfo("导入完成", str(result))
+    
+    def export_tasks(self):
+        """导出全部任务（不含归档）"""
+        if self.loading:
+            return
+        path = filedialog.asksaveasfilename(
+            title="导出任务", defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("Markdown清单", "*.md")])
+        if not path:
+            return
+        try:
+            for group in self.store.group_names():
+                self.ensure_group_loaded(group)
+            count = export_file(self.store.iter_ordered(), path)
+        except Exception as e:
+            print(f"导出任务失败: {e}")
+            messagebox.showerror("导出失败", str(e))
+            return
+        messagebox.showinfo("导出完成", f"已导出 {count} 条任务")
+    
     def toggle_task(self, todo_id):
         """切换任务完成状态"""
-        for todo in self.todos:
-            if todo["id"] == todo_id:
-                todo["completed"] = not todo["completed"]
-                break
+        if self.store.toggle(todo_id) is None:
+            return
         self.save_data()
         self.refresh_todo_list()
     
     def edit_task(self, todo_id):
         """编辑任务"""
-        todo = None
-        for t in self.todos:
-            if t["id"] == todo_id:
-                todo = t
-                break
-        
+        todo = self.store.get(todo_id)
         if not todo:
             return
         
@@ -806,8 +1165,8 @@ class DesktopTodoApp:
         dialog.grab_set()
         
         # 根据内容自适应窗口大小
-        text_lines = todo["text"].count('\n') + 1
-        text_length = len(todo["text"])
+        text_lines = todo.text.count('\n') + 1
+        text_length = len(todo.text)
         
         if text_length > 200 or text_lines > 5:
             dialog_width = 500
@@ -844,13 +1203,13 @@ class DesktopTodoApp:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         text_widget.config(yscrollcommand=scrollbar.set)
         
-        text_widget.insert("1.0", todo["text"])
+        text_widget.insert("1.0", todo.text)
         text_widget.focus()
         
         def save_edit():
             new_text = text_widget.get("1.0", "end-1c").strip()
             if new_text:
-                todo["text"] = new_text
+                self.store.set_text(todo_id, new_text)
                 self.save_data()
                 dialog.destroy()
                 # 强制刷新界面，确保布局正确更新
@@ -875,404 +1234,355 @@ class DesktopTodoApp:
     
     def delete_task(self, todo_id):
         """删除任务"""
-        self.todos = [t for t in self.todos if t["id"] != todo_id]
-        for i, todo in enumerate(self.todos):
-            todo["order"] = i
+        if self.store.remove(todo_id) is None:
+            return
         self.save_data()
         self.refresh_todo_list()
     
     def move_task_up(self, todo_id):
         """向上移动任务（仅在当前分组内）"""
-        # 获取当前分组的任务，按order排序
-        group_todos = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        sorted_group_todos = sorted(group_todos, key=lambda x: x.get("order", 0))
-        
-        # 找到当前任务的索引
-        current_index = -1
-        for i, todo in enumerate(sorted_group_todos):
-            if todo["id"] == todo_id:
-                current_index = i
-                break
-        
         # 如果不是第一个，与上一个交换
-        if current_index > 0:
-            # 交换两个任务在列表中的位置
-            sorted_group_todos[current_index], sorted_group_todos[current_index - 1] = \
-                sorted_group_todos[current_index - 1], sorted_group_todos[current_index]
-            
-            # 重新分配order值
-            for i, todo in enumerate(sorted_group_todos):
-                todo["order"] = i
-            
+        if self.store.move_up(todo_id):
             self.save_data()
             self.refresh_todo_list()
     
-    def start_drag_task(self, event, item_frame, todo_id):
-        """开始拖拽任务"""
+    def start_drag_task(self, event, row, todo_id):
+        """开始拖拽任务：原位置变成黄色占位，鼠标处显示浮动的任务文本"""
+        if self.active_filter is not None:
+            # 筛选视图中的任务可能来自不同分组，不支持拖拽排序
+            return
         self.dragging_task = todo_id
         self.drag_start_index = self.get_task_index(todo_id)
-        
-        # 强烈的视觉反馈 - 黄色高亮
-        item_frame.config(relief=tk.RAISED, bd=4, bg="#ffeb3b", cursor="move")
+        self.drag_original = [entry for entry in self.view.entries if entry[0] == "todo"]
+        self.drag_rest = [entry for entry in self.view.entries if entry[0] != "todo"]
+        self.drag_preview = list(self.drag_original)
+        self.drag_position = next(i for i, (kind, todo) in enumerate(self.drag_original)
+                                  if todo.id == todo_id)
+        self.drag_y_root = event.y_root
+        self.view.drag_key = ("todo", todo_id)
+        
+        row.highlight(True)
+        self.view.show_ghost(row.todo, self.canvas.canvasy(event.y_root - self.canvas.winfo_rooty()))
     
-    def on_drag_task(self, event, item_frame):
-        """拖拽任务中"""
+    def on_drag_task(self, event, row):
+        """拖拽任务中：只记下鼠标位置，每帧（约16ms）最多处理一次"""
         if self.dragging_task is None:
             return
-        
-        # 获取鼠标相对于容器的Y坐标
-        container_y = self.todo_container.winfo_rooty()
-        mouse_y = event.y_root - container_y
-        
-        # 获取所有任务项
-        all_items = [w for w in self.todo_container.winfo_children() 
-                     if isinstance(w, tk.Frame) and hasattr(w, 'todo_id')]
-        
-        if len(all_items) <= 1:
+        self.drag_y_root = event.y_root
+        if self.drag_frame_pending is None:
+            self.drag_frame_pending = self.root.after(16, self.drag_frame)
+    
+    def drag_frame(self):
+        """移动浮动行；鼠标越过其他任务时只调整预览顺序（行只移动位置，不重建）"""
+        self.drag_frame_pending = None
+        if self.dragging_task is None:
             return
-        
-        # 找到鼠标位置对应的目标索引
-        target_index = 0
-        for i, item in enumerate(all_items):
-            item_y = item.winfo_y()
-            item_height = item.winfo_height()
-            if mouse_y > item_y + item_height / 2:
-                target_index = i + 1
-        
-        target_index = min(target_index, len(all_items) - 1)
-        
-        # 找到当前拖拽项的索引
-        current_index = -1
-        for i, item in enumerate(all_items):
-            if item.todo_id == self.dragging_task:
-                current_index = i
-                break
-        
-        # 如果位置改变，执行交换
-        if current_index != -1 and current_index != target_index:
-            self.move_task_to_position(current_index, target_index)
-    
-    def stop_drag_task(self, event, item_frame, todo_id):
-        """停止拖拽任务"""
+        canvas = self.canvas
+        pointer_y = self.drag_y_root - canvas.winfo_rooty()
+        
+        # 靠近列表上下边缘时自动滚动，鼠标不动也继续
+        scrolling = 0
+        if pointer_y < 20:
+            scrolling = -1
+        elif pointer_y > canvas.winfo_height() - 20:
+            scrolling = 1
+        if scrolling:
+            canvas.yview_scroll(scrolling, "units")
+        
+        y = canvas.canvasy(pointer_y)
+        self.view.move_ghost(y)
+        target = min(max(self.view.index_at(y), 0), len(self.drag_preview) - 1)
+        if target != self.drag_position:
+            entry = self.drag_preview.pop(self.drag_position)
+            self.drag_preview.insert(target, entry)
+            self.drag_position = target
+            self.view.set_entries(self.drag_preview + self.drag_rest)
+        if scrolling:
+            self.drag_frame_pending = self.root.after(16, self.drag_frame)
+    
+    def stop_drag_task(self, event, row, todo_id):
+        """停止拖拽任务：一次性移动到预览位置并保存"""
         if self.dragging_task is None:
             return
+        if self.drag_frame_pending is not None:
+            self.root.after_cancel(self.drag_frame_pending)
+            self.drag_frame_pending = None
+        self.view.hide_ghost()
+        self.view.drag_key = None
         
-        # 保存新的顺序
-        self.save_task_order()
+        # 预览位置上原来的任务在分组中的位置就是目标位置（隐藏已完成时也正确）
+        from_index = self.drag_start_index
+        to_index = self.get_task_index(self.drag_original[self.drag_position][1].id)
         
         # 清除拖拽状态
         self.dragging_task = None
         self.drag_start_index = -1
+        self.drag_original = self.drag_preview = self.drag_rest = []
         
-        # 刷新列表以恢复正常样式
+        # 恢复正常样式（行按任务id保留，内容没变时刷新不会重绘它）
+        if row.todo is not None and row.todo.id == todo_id:
+            row.highlight(False)
+        if self.store.move_to_position(self.current_group, from_index, to_index):
+            self.save_data()
         self.refresh_todo_list()
     
     def get_task_index(self, todo_id):
         """获取任务在当前分组中的索引"""
-        group_todos = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        sorted_group_todos = sorted(group_todos, key=lambda x: x.get("order", 0))
-        
-        for i, todo in enumerate(sorted_group_todos):
-            if todo["id"] == todo_id:
-                return i
-        return -1
-    
-    def move_task_to_position(self, from_index, to_index):
-        """将任务从from_index移动到to_index"""
-        group_todos = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        sorted_group_todos = sorted(group_todos, key=lambda x: x.get("order", 0))
-        
-        if from_index < 0 or to_index < 0 or from_index >= len(sorted_group_todos) or to_index >= len(sorted_group_todos):
-            return
-        
-        # 移动任务
-        task = sorted_group_todos.pop(from_index)
-        sorted_group_todos.insert(to_index, task)
-        
-        # 重新分配order值
-        for i, todo in enumerate(sorted_group_todos):
-            todo["order"] = i
-        
-        # 刷新显示
-        self.refresh_todo_list()
-    
-    def save_task_order(self):
-        """保存任务顺序"""
-        self.save_data()
+        return self.store.index_of(todo_id)
     
     def move_task_down(self, todo_id):
         """向下移动任务（仅在当前分组内）"""
-        # 获取当前分组的任务，按order排序
-        group_todos = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        sorted_group_todos = sorted(group_todos, key=lambda x: x.get("order", 0))
-        
-        # 找到当前任务的索引
-        current_index = -1
-        for i, todo in enumerate(sorted_group_todos):
-            if todo["id"] == todo_id:
-                current_index = i
-                break
-        
         # 如果不是最后一个，与下一个交换
-        if current_index >= 0 and current_index < len(sorted_group_todos) - 1:
-            # 交换两个任务在列表中的位置
-            sorted_group_todos[current_index], sorted_group_todos[current_index + 1] = \
-                sorted_group_todos[current_index + 1], sorted_group_todos[current_index]
-            
-            # 重新分配order值
-            for i, todo in enumerate(sorted_group_todos):
-                todo["order"] = i
-            
+        if self.store.move_down(todo_id):
             self.save_data()
             self.refresh_todo_list()
     
     def refresh_todo_list(self):
-        """刷新待办事项列表显示"""
-        for widget in self.todo_container.winfo_children():
-            widget.destroy()
+        """刷新待办事项列表显示（只有可见区域内的行会被创建或复用）"""
+        if self.loading:
+            queued = f"（已排队{len(self.pending_adds)}条新任务）" if self.pending_adds else ""
+            self.view.set_entries([])
+            self.view.set_footer(message=f"正在加载…{queued}")
+            self.stats_label.config(text=f"[{self.current_group}] 加载中…")
+            return
+        if self.active_filter is not None:
+            self.refresh_filter_view()
+            return
         
         # 筛选当前分组的任务
-        group_todos = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        
-        if self.show_completed:
-            display_todos = group_todos
-        else:
-            display_todos = [t for t in group_todos if not t["completed"]]
+        display_todos = self.store.visible_todos(self.current_group, self.show_completed)
+        total, completed = self.store.counts(self.current_group)
+        archived = self.archive.count(self.current_group)
         
+        entries = [("todo", todo) for todo in display_todos]
+        empty_text = ""
         if not display_todos:
-            if not group_todos:
+            if not total:
                 empty_text = f"'{self.current_group}'暂无待办事项\n点击上方添加新任务"
             else:
                 empty_text = "所有任务已完成！\n勾选\"显示已完成\"查看"
-            empty_label = tk.Label(self.todo_container, 
-                                  text=empty_text,
-                                  font=("微软雅黑", 12),
-                                  fg="#999", bg="white",
-                                  pady=50)
-            empty_label.pack()
-        else:
-            if display_todos and "order" not in display_todos[0]:
-                for i, todo in enumerate(self.todos):
-                    if "order" not in todo:
-                        todo["order"] = i
-            
-            sorted_todos = sorted(display_todos, key=lambda x: x.get("order", 0))
-            
-            for i, todo in enumerate(sorted_todos):
-                full_index = self.todos.index(todo)
-                self.create_todo_item(todo, full_index)
+        
+        # 已归档的任务只在显示已完成时按页读出，排在最后
+        more_text = ""
+        if self.show_completed and archived:
+            entries.extend(("archived", todo) for todo in self.archived_todos)
+            remaining = archived - self.archive_consumed
+            if remaining > 0:
+                more_text = f"📦 加载已归档任务（还有{remaining}条）"
+        
+        before = dict(self.view.counters)
+        misses = self.view.measurer.misses
+        hits = self.view.measurer.hits
+        start = time.perf_counter()
+        self.view.set_entries(entries)
+        self.view.set_footer(message=empty_text, button_text=more_text,
+                             command=self.load_archived_page)
+        if self.render_stats:
+            # 连同Tk的布局和重绘一起计时，便于比较两种画法
+            self.root.update_idletasks()
+            elapsed = (time.perf_counter() - start) * 1000
+            done = {key: value - before[key] for key, value in self.view.counters.items()}
+            print(f"刷新列表({self.view.renderer}): {elapsed:.1f}ms | 新建控件{done['widgets']}个 | "
+                  f"新取用{done['acquired']}行 | 重绘{done['restyled']}行 | "
+                  f"移动{done['moved']}行 | 回收{done['released']}行 | "
+                  f"测量折行{self.view.measurer.misses - misses}次 | "
+                  f"折行缓存命中{self.view.measurer.hits - hits}次")
         
         # 更新统计信息（只统计当前分组）
-        total = len(group_todos)
-        completed = sum(1 for t in group_todos if t["completed"])
         pending = total - completed
+        archived_text = f" | 已归档: {archived}" if archived else ""
         
         if self.show_completed:
             self.stats_label.config(
-                text=f"[{self.current_group}] 总计: {total} | 待完成: {pending} | 已完成: {completed}"
+                text=f"[{self.current_group}] 总计: {total} | 待完成: {pending} | 已完成: {completed}{archived_text}"
             )
         else:
             self.stats_label.config(
-                text=f"[{self.current_group}] 待完成: {pending} | 已完成: {completed}(已隐藏)"
+                text=f"[{self.current_group}] 待完成: {pending} | 已完成: {completed}(已隐藏){archived_text}"
             )
     
-    def create_todo_item(self, todo, index):
-        """创建单个待办事项显示项"""
-        item_frame = tk.Frame(self.todo_container, 
-                             bg="#f9f9f9" if not todo["completed"] else "#e8e8e8",
-                             relief=tk.SOLID, bd=1)
-        item_frame.pack(fill=tk.X, padx=5, pady=3)
-        
-        # 保存item_frame的引用，用于拖拽
-        item_frame.todo_id = todo["id"]
-        
-        left_frame = tk.Frame(item_frame, bg=item_frame["bg"])
-        left_frame.pack(side=tk.LEFT, padx=5)
-        
-        drag_label = tk.Label(left_frame, text="☰", 
-                             font=("微软雅黑", 12),
-                             fg="#999",
-                             bg=item_frame["bg"],
-                             cursor="hand2")
-        drag_label.pack(side=tk.LEFT, padx=(0, 5))
-        
-        # 绑定拖拽事件
-        drag_label.bind("<Button-1>", lambda e: self.start_drag_task(e, item_frame, todo["id"]))
-        drag_label.bind("<B1-Motion>", lambda e: self.on_drag_task(e, item_frame))
-        drag_label.bind("<ButtonRelease-1>", lambda e: self.stop_drag_task(e, item_frame, todo["id"]))
-        
-        check_var = tk.BooleanVar(value=todo["completed"])
-        check_btn = tk.Checkbutton(left_frame, 
-                                  variable=check_var,
-                                  command=lambda: self.toggle_task(todo["id"]),
-                                  bg=item_frame["bg"],
-                                  cursor="hand2")
-        check_btn.pack(side=tk.LEFT)
-        
-        text_style = ("微软雅黑", 11)
-        text_fg = "#999" if todo["completed"] else "#333"
-        
-        text_frame = tk.Frame(item_frame, bg=item_frame["bg"])
-        text_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # 使用Text组件支持超链接
-        full_text = todo["text"]  # 保留完整文本用于超链接匹配
-        display_text = full_text
-        # 增加显示字符数从50到100
-        if len(display_text) > 100:
-            display_text = display_text[:100] + "..."
-        
-        # 计算需要的高度
-        lines = display_text.count('\n') + 1
-        height = min(lines, 3)  # 增加最大行数从2到3
-        
-        task_text = tk.Text(text_frame,
-                           font=text_style,
-                           fg=text_fg,
-                           bg=item_frame["bg"],
-                           wrap=tk.WORD,
-                           height=height,
-                           width=30,  # 增加宽度从20到30
-                           relief=tk.FLAT,
-                           cursor="hand2",
-                           state=tk.NORMAL)
-        task_text.pack(anchor="w", fill=tk.X, expand=True)
-        
-        # 插入文本
-        task_text.insert("1.0", display_text)
-        
-        # 查找并标记超链接（在完整文本中查找）
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        urls = list(re.finditer(url_pattern, full_text))
-        
-        # 配置超链接样式
-        task_text.tag_config("hyperlink", foreground="#2196F3", underline=True)
-        task_text.tag_config("hyperlink_hover", foreground="#1976D2", underline=True)
-        
-        for match in urls:
-            url = match.group()
-            start_pos = match.start()
-            end_pos = match.end()
-            
-            # 只标记在显示文本范围内的部分
-            if start_pos < len(display_text):
-                # 如果URL被截断，只标记显示的部分
-                display_end = min(end_pos, len(display_text) - 3 if len(full_text) > 60 else len(display_text))
-                
-                start_idx = f"1.0+{start_pos}c"
-                end_idx = f"1.0+{display_end}c"
-                
-                task_text.tag_add("hyperlink", start_idx, end_idx)
-                # 绑定完整URL（不是截断的）
-                task_text.tag_bind("hyperlink", "<Button-1>", 
-                                 lambda e, u=url: webbrowser.open(u))
-                task_text.tag_bind("hyperlink", "<Enter>", 
-                                 lambda e: task_text.config(cursor="hand2"))
-                task_text.tag_bind("hyperlink", "<Leave>", 
-                                 lambda e: task_text.config(cursor="hand2"))
-        
-        # 禁用编辑
-        task_text.config(state=tk.DISABLED)
-        
-        # 双击编辑
-        task_text.bind("<Double-Button-1>", lambda e, tid=todo["id"]: self.edit_task(tid))
-        
-        if todo["completed"]:
-            task_text.config(font=("微软雅黑", 11, "overstrike"))
-        
-        time_label = tk.Label(text_frame,
-                             text=todo["created_at"],
-                             font=("微软雅黑", 8),
-                             fg="#aaa",
-                             bg=item_frame["bg"],
-                             anchor="w",
-                             cursor="hand2")
-        time_label.pack(anchor="w")
-        time_label.bind("<Double-Button-1>", lambda e, tid=todo["id"]: self.edit_task(tid))
-        
-        right_frame = tk.Frame(item_frame, bg=item_frame["bg"])
-        right_frame.pack(side=tk.RIGHT, padx=2)
-        
-        # 获取当前分组的任务列表用于排序（按order排序后的）
-        group_todos = [t for t in self.todos if t.get("group", "默认分组") == self.current_group]
-        sorted_group_todos = sorted(group_todos, key=lambda x: x.get("order", 0))
-        
-        # 通过ID查找索引
-        current_index_in_group = -1
-        for i, t in enumerate(sorted_group_todos):
-            if t["id"] == todo["id"]:
-                current_index_in_group = i
-                break
-        
-        if current_index_in_group > 0:
-            up_btn = tk.Button(right_frame, text="↑",
-                              command=lambda: self.move_task_up(todo["id"]),
-                              font=("微软雅黑", 9, "bold"),
-                              fg="#2196F3",
-                              bg=item_frame["bg"],
-                              relief=tk.FLAT,
-                              cursor="hand2",
-                              padx=3, pady=0)
-            up_btn.pack(side=tk.LEFT, padx=1)
-        
-        if current_index_in_group < len(sorted_group_todos) - 1:
-            down_btn = tk.Button(right_frame, text="↓",
-                                command=lambda: self.move_task_down(todo["id"]),
-                                font=("微软雅黑", 9, "bold"),
-                                fg="#2196F3",
-                                bg=item_frame["bg"],
-                                relief=tk.FLAT,
-                                cursor="hand2",
-                                padx=3, pady=0)
-            down_btn.pack(side=tk.LEFT, padx=1)
-        
-        delete_btn = tk.Button(right_frame, text="✕",
-                              command=lambda: self.delete_task(todo["id"]),
-                              font=("微软雅黑", 9, "bold"),
-                              fg="#f44336",
-                              bg=item_frame["bg"],
-                              relief=tk.FLAT,
-                              cursor="hand2",
-                              padx=3, pady=0)
-        delete_btn.pack(side=tk.LEFT, padx=1)
-    
-    def load_data(self):
-        """从文件加载数据"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.todos = json.load(f)
-                    # 为旧数据添加group字段
-                    for todo in self.todos:
-                        if "group" not in todo:
-                            todo["group"] = "默认分组"
-                    
-                    # 为每个分组的任务初始化order值
-                    groups = {}
-                    for todo in self.todos:
-                        group = todo.get("group", "默认分组")
-                        if group not in groups:
-                            groups[group] = []
-                        groups[group].append(todo)
-                    
-                    # 为每个分组的任务分配连续的order值
-                    for group, todos in groups.items():
-                        for i, todo in enumerate(todos):
-                            if "order" not in todo:
-                                todo["order"] = i
-            except Exception as e:
-                print(f"加载数据失败: {e}")
-                self.todos = []
+    def refresh_filter_view(self):
+        """显示符合筛选条件的任务（不含归档）"""
+        try:
+            todos = self.filtered_todos()
+        except Exception as e:
+            print(f"筛选失败: {e}")
+            todos = []
+        display_todos = todos if self.show_completed else [todo for todo in todos if not todo.completed]
+        self.view.set_entries([("todo", todo) for todo in display_todos])
+        self.view.set_footer(message="" if display_todos else "没有符合筛选条件的任务")
+        
+        hidden = len(todos) - len(display_todos)
+        hidden_text = f" | 已完成: {hidden}(已隐藏)" if hidden else ""
+        self.stats_label.config(
+            text=f"[🔖 {self.active_filter.query}] 匹配: {len(display_todos)}{hidden_text}"
+        )
+    
+    def reset_archive_view(self):
+        """清空已读出的归档任务（切换分组或隐藏已完成时）"""
+        self.archived_todos = []
+        self.archive_cursor = None
+        self.archive_consumed = 0
+    
+    def load_archived_page(self):
+        """从归档分段中读出下一页任务"""
+        self.read_archived_page()
+        self.refresh_todo_list()
+    
+    def read_archived_page(self):
+        """读出下一页归档任务（不刷新列表），返回是否读到了任务"""
+        if self.archive_cursor is None:
+            self.archive_cursor = self.archive.iter_group(self.current_group)
+        consumed = self.archive_consumed
+        try:
+            for todo in itertools.islice(self.archive_cursor, self.archive_page_size):
+                self.archive_consumed += 1
+                # 归档后未来得及从热数据删除的任务不重复显示
+                if todo.id not in self.store:
+                    self.archived_todos.append(todo)
+        except Exception as e:
+            print(f"读取归档失败: {e}")
+        return self.archive_consumed > consumed
+    
+    def start_loading(self):
+        """在后台线程打开存储并解析数据，完成后由界面线程接手"""
+        self.load_thread = threading.Thread(target=self._load_worker,
+                                            args=(self.storage_mode, self.current_group),
+                                            daemon=True)
+        self.load_thread.start()
+        self.root.after(20, self.poll_loading)
+    
+    def _load_worker(self, mode, group):
+        """后台线程：不访问任何控件，结果放入load_queue"""
+        storage = None
+        try:
+            storage = open_storage(self.data_file, mode)
+            if storage.lazy:
+                # 只载入当前分组，其余分组在切换时载入
+                store = TodoStore()
+                store.set_lazy(storage.group_counts())
+                store.load_group(group, storage.load_group(group))
+            else:
+                # 旧数据的group、order字段和浮点id由TodoStore补齐、换新
+                store = TodoStore(storage.load())
+            self.load_queue.put((storage, store, None))
+        except Exception as e:
+            self.load_queue.put((storage, None, e))
+    
+    def poll_loading(self):
+        """检查后台加载是否完成"""
+        try:
+            storage, store, error = self.load_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(20, self.poll_loading)
+            return
+        self.finish_loading(storage, store, error)
+    
+    def finish_loading(self, storage, store, error):
+        """界面线程接手加载结果，补上排队的新任务"""
+        if error is not None:
+            print(f"加载数据失败: {error}")
+            # 不换用其他存储，也不保存任何修改，以免空数据覆盖用户的数据文件
+            store = TodoStore()
+            self.read_only = True
+        self.storage = storage
+        self.store = store
+        self.search.attach(store)
+        self.tag_index.attach(store)
+        self.loading = False
+        
+        if self.read_only:
+            self.root.title("桌面待办事项（只读）")
+            messagebox.showerror("加载数据失败",
+                                 f"{error}\n\n本次运行为只读模式，所做的修改不会保存。\n"
+                                 "请检查数据文件或配置中的storage后重新启动。")
         else:
-            self.todos = []
+            if self.store.has_changes():
+                self.save_data()
+            if self.storage.lazy:
+                for group in self.store.group_names():
+                    if self.store.is_loaded(group):
+                        self.archive_old_tasks(group)
+            else:
+                self.archive_old_tasks()
+        # 加载期间可能切换过分组
+        self.ensure_group_loaded(self.current_group)
+        
+        for text, group in self.pending_adds:
+            self.ensure_group_loaded(group)
+            self.store.add(text, group)
+        if self.pending_adds:
+            self.pending_adds = []
+            self.save_data()
+        
+        self.refresh_todo_list()
+        if self.search_var.get().strip():
+            self.run_search()
+        self.timer.mark("后台加载数据完成")
+        self.startup_step_done()
+    
+    def on_first_paint(self):
+        """构建界面时排入的重绘也是空闲任务，排在它们之后执行即为首次绘制完成"""
+        self.timer.mark("首次绘制")
+        self.startup_step_done()
+    
+    def startup_step_done(self):
+        """首次绘制和数据加载都完成后输出启动耗时"""
+        self.startup_steps += 1
+        if self.startup_steps == 2:
+            self.timer.report()
+    
+    def ensure_group_loaded(self, group):
+        """懒加载模式下，分组第一次用到时才载入其任务"""
+        if self.loading or self.store.is_loaded(group):
+            return
+        try:
+            self.store.load_group(group, self.storage.load_group(group))
+        except Exception as e:
+            print(f"加载分组失败: {e}")
+            return
+        if self.store.has_changes():
+            self.save_data()
+        self.archive_old_tasks(group)
+    
+    def archive_old_tasks(self, group=None):
+        """把较早的已完成任务移入归档（group为None时处理全部已载入的任务）"""
+        if self.archive_after_days <= 0:
+            return
+        # 归档和删除在写盘锁内完成，之后的一轮写盘一定先写新分段、再写删除了这些任务的数据；
+        # 后台正在写盘时不等待，稍后再试
+        if not self.writer.try_lock():
+            self.root.after(100, lambda: self.archive_old_tasks(group))
+            return
+        try:
+            count = archive_completed(self.store, self.archive, self.archive_after_days, group)
+        except Exception as e:
+            print(f"归档失败: {e}")
+            return
+        finally:
+            self.writer.unlock()
+        if count:
+            self.search.invalidate_archive()
+        # 补记了完成时间的旧任务也要保存
+        if self.store.has_changes():
+            self.save_data()
     
     def save_data(self):
-        """保存数据到文件"""
+        """登记数据变更，由后台线程合并写盘"""
+        if self.loading or self.read_only:
+            return
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.todos, f, ensure_ascii=False, indent=2)
+            self.storage.record(self.store)
         except Exception as e:
             print(f"保存数据失败: {e}")
+            return
+        self.writer.mark_dirty("data")
+    
+    def _write_data(self):
+        """写数据文件（后台线程）：先写归档，归档失败时不写数据，移入归档的任务不会丢失
+        归档在写盘锁内进行（见archive_old_tasks），这里看到的新分段和删除总是成对的"""
+        self.archive.flush()
+        self.storage.flush(self.store)
     
     def load_config(self):
         """加载配置"""
@@ -1284,6 +1594,13 @@ class DesktopTodoApp:
                     self.auto_hide_enabled = config.get("auto_hide_enabled", False)
                     self.close_to_tray = config.get("close_to_tray", False)
                     self.remember_choice = config.get("remember_choice", False)
+                    self.storage_mode = config.get("storage", "json")
+                    self.save_delay_ms = config.get("save_delay_ms", 300)
+                    self.archive_after_days = config.get("archive_after_days", 0)
+                    self.row_renderer = config.get("row_renderer", "widgets")
+                    self.font_size = config.get("font_size", 11)
+                    self.saved_filters = config.get("saved_filters", [])
+                    self.csv_columns = config.get("csv_columns", {})
                     self.groups = config.get("groups", ["默认分组"])
                     self.current_group = config.get("current_group", "默认分组")
                     # 确保当前分组在分组列表中
@@ -1293,23 +1610,37 @@ class DesktopTodoApp:
                 print(f"加载配置失败: {e}")
     
     def save_config(self):
-        """保存配置"""
+        """标记配置需要保存，由后台线程合并写盘"""
+        self.writer.mark_dirty("config")
+    
+    def _write_config(self):
+        """写配置文件（后台线程）"""
         try:
             config = {
                 "show_completed": self.show_completed,
                 "auto_hide_enabled": self.auto_hide_enabled,
                 "close_to_tray": self.close_to_tray,
                 "remember_choice": self.remember_choice,
-                "groups": self.groups,
+                "storage": self.storage_mode,
+                "save_delay_ms": self.save_delay_ms,
+                "archive_after_days": self.archive_after_days,
+                "row_renderer": self.row_renderer,
+                "font_size": self.font_size,
+                "saved_filters": list(self.saved_filters),
+                "csv_columns": dict(self.csv_columns),
+                "groups": list(self.groups),
                 "current_group": self.current_group
             }
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            write_json_atomic(self.config_file, config)
         except Exception as e:
             print(f"保存配置失败: {e}")
     
     def create_tray_icon(self):
         """创建系统托盘图标"""
+        # PIL和pystray只有托盘用到，第一次隐藏到托盘时才导入，不拖慢每次启动
+        from PIL import Image, ImageDraw
+        import pystray
+        
         # 创建图标图像
         image = Image.new('RGB', (64, 64), color='#4CAF50')
         draw = ImageDraw.Draw(image)
@@ -1341,24 +1672,60 @@ class DesktopTodoApp:
         self.root.deiconify()
         self.root.lift()
         self.root.focus_force()
-        # 如果开启了侧边隐藏，确保窗口完全显示
-        if self.auto_hide_enabled and self.is_hidden:
-            self.show_window()
+        # 恢复侧边隐藏的检查；如果窗口处于隐藏状态，先完全显示
+        self.auto_hide.resume()
     
     def hide_to_tray(self):
-        """隐藏到系统托盘"""
-        self.root.withdraw()
+        """隐藏到系统托盘（先建好托盘图标再隐藏窗口，建不了时退而最小化）"""
         if not self.tray_icon:
-            self.create_tray_icon()
+            tray_timer = StartupTimer(enabled=self.timer.enabled)
+            try:
+                self.create_tray_icon()
+            except Exception as e:
+                # 例如没有安装Pillow/pystray：隐藏后将无法找回窗口
+                print(f"创建托盘图标失败: {e}")
+                self.tray_icon = None
+                messagebox.showwarning("提示", f"无法创建托盘图标，窗口将最小化到任务栏\n\n{e}")
+                self.minimize_without_tray()
+                return
+            tray_timer.mark("create_tray_icon（含导入PIL和pystray）")
+            tray_timer.report("托盘耗时")
             # 在新线程中运行托盘图标
             threading.Thread(target=self.tray_icon.run, daemon=True).start()
+        self.root.withdraw()
+        # 托盘期间不再有任何定时唤醒
+        self.auto_hide.pause()
+    
+    def minimize_without_tray(self):
+        """最小化到任务栏：无边框窗口不能最小化，先恢复边框，还原时再去掉"""
+        self.auto_hide.pause()
+        self.root.overrideredirect(False)
+        self.root.iconify()
+        self.root.bind("<Map>", self.on_restore_from_minimize)
+    
+    def on_restore_from_minimize(self, event):
+        """从任务栏还原"""
+        if event.widget is not self.root:
+            return
+        self.root.unbind("<Map>")
+        self.root.overrideredirect(True)
+        self.auto_hide.resume()
     
     def quit_app(self, icon=None, item=None):
         """退出应用"""
         if self.tray_icon:
             self.tray_icon.stop()
+        if self.loading:
+            # 等后台加载完成，排队的新任务才能保存
+            self.load_thread.join()
+            self.poll_loading()
         self.save_data()
         self.save_config()
+        # 同步写出所有未落盘的内容
+        self.writer.stop()
+        if self.storage is not None:
+            self.storage.close()
+        self.data_lock.release()
         self.root.quit()
     
     def on_closing(self):
@@ -1463,8 +1830,11 @@ class DesktopTodoApp:
         dialog.bind("<Escape>", lambda e: on_cancel())
 
 def main():
+    timer = StartupTimer(_START_TIME, enabled=bool(os.environ.get("TODO_STARTUP_TIMING")))
+    timer.mark("导入模块")
     root = tk.Tk()
-    app = DesktopTodoApp(root)
+    timer.mark("创建Tk")
+    app = DesktopTodoApp(root, timer)
     root.mainloop()
 
 if __name__ == "__main__":
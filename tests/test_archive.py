@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import time
+
+from todo_archive import TodoArchive, archive_completed
+from todo_store import Todo, TodoStore
+
+DAY = 86400
+
+
+def _archive(tmp_path):
+    return TodoArchive(str(tmp_path / "todo_archive"))
+
+
+def test_toggle_records_and_clears_completion_time():
+    store = TodoStore()
+    todo = store.add("写周报", "工作")
+    store.toggle(todo.id)
+    assert abs(todo.completed_time - time.time()) < 5
+    assert "completed_at" in todo.to_dict()
+    store.toggle(todo.id)
+    assert todo.completed_time is None
+    assert todo.extra is None
+
+
+def test_completion_time_round_trips_through_dict():
+    todo = Todo(1, "写周报", completed=True, created=int(time.time()))
+    todo.set_completed_time(int(time.time()) - 3 * DAY)
+    assert Todo.from_dict(todo.to_dict()).completed_time == todo.completed_time
+
+
+def test_age_is_measured_from_completion_not_creation(tmp_path):
+    now = int(time.time())
+    old_created = Todo(1, "很久以前创建，今天完成", created=now - 100 * DAY)
+    finished_long_ago = Todo(2, "很久以前完成", completed=True, created=now - 100 * DAY)
+    finished_long_ago.set_completed_time(now - 40 * DAY)
+    store = TodoStore([old_created, finished_long_ago])
+    store.toggle(old_created.id)
+    
+    archive = _archive(tmp_path)
+    assert archive_completed(store, archive, 30) == 1
+    assert old_created.id in store
+    assert finished_long_ago.id not in store
+    assert [todo.id for todo in archive.iter_all()] == [finished_long_ago.id]
+
+
+def test_legacy_completed_tasks_start_aging_now(tmp_path):
+    legacy = Todo(1, "旧数据", completed=True, created=int(time.time()) - 100 * DAY)
+    store = TodoStore([legacy])
+    store.pop_changes()
+    
+    assert archive_completed(store, _archive(tmp_path), 30) == 0
+    assert legacy.id in store
+    assert abs(legacy.completed_time - time.time()) < 5
+    # 补记的完成时间要保存下来，下次启动不会重新计时
+    assert legacy.id in store.pop_changes()
+
+
+def test_append_and_move_group_write_only_on_flush(tmp_path):
+    archive = _archive(tmp_path)
+    now = int(time.time())
+    archive.append([Todo(1, "周报", True, now, group="工作"), Todo(2, "买菜", True, now, group="生活")])
+    archive.move_group("工作", "项目")
+    # 登记后即可读出，但还没有写盘
+    assert not (tmp_path / "todo_archive").exists()
+    assert archive.count("项目") == 1
+    assert [(todo.id, todo.group) for todo in archive.iter_group("项目")] == [(1, "项目")]
+    
+    archive.flush()
+    assert not archive.has_changes()
+    reopened = _archive(tmp_path)
+    assert (reopened.count("项目"), reopened.count("工作")) == (1, 0)
+    assert [(todo.id, todo.group) for todo in reopened.iter_all()] == [(1, "项目"), (2, "生活")]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from todo_filter import TagIndex, compile_filter
+from todo_search import TodoSearchIndex
+from todo_store import TodoStore
+
+
+def _setup(tasks):
+    """tasks: [(文本, 分组)]"""
+    store = TodoStore()
+    todos = [store.add(text, group) for text, group in tasks]
+    tags = TagIndex()
+    tags.attach(store)
+    search = TodoSearchIndex()
+    search.attach(store)
+    return store, tags, search, todos
+
+
+def _texts(store, tags, search, query):
+    return sorted(store.get(todo_id).text for todo_id in tags.apply(compile_filter(query), search))
+
+
+def test_compile_filter_conditions():
+    todo_filter = compile_filter('group:"我的 项目" #Urgent tag:#home is:open 周报 -is:done -#someday')
+    assert todo_filter.include == [("group", "我的 项目"), ("tag", "urgent"), ("tag", "home"),
+                                   ("status", False), ("text", "周报")]
+    assert todo_filter.exclude == [("status", True), ("tag", "someday")]
+
+
+def test_compile_filter_rejects_bad_input():
+    with pytest.raises(ValueError):
+        compile_filter("is:later")
+    with pytest.raises(ValueError):
+        compile_filter('group:"未闭合')
+    with pytest.raises(ValueError):
+        compile_filter("   ")
+
+
+def test_apply_intersects_includes_and_subtracts_excludes():
+    store, tags, search, _ = _setup([
+        ("写周报 #urgent", "工作"),
+        ("修bug #urgent #backend", "工作"),
+        ("买菜 #urgent", "生活"),
+        ("看电影 #someday", "生活"),
+    ])
+    assert _texts(store, tags, search, "group:工作 #urgent") == sorted(["写周报 #urgent", "修bug #urgent #backend"])
+    assert _texts(store, tags, search, "#urgent -#backend") == sorted(["写周报 #urgent", "买菜 #urgent"])
+    assert _texts(store, tags, search, "-group:工作") == sorted(["买菜 #urgent", "看电影 #someday"])
+    assert _texts(store, tags, search, "#urgent 周报") == ["写周报 #urgent"]
+    assert _texts(store, tags, search, "#urgent #someday") == []
+
+
+def test_index_follows_toggle_regroup_and_tag_edits():
+    store, tags, search, (report, fix) = _setup([("写周报 #urgent", "工作"), ("修bug", "工作")])
+    assert _texts(store, tags, search, "#urgent is:open") == ["写周报 #urgent"]
+    
+    store.toggle(report.id)
+    assert _texts(store, tags, search, "#urgent is:open") == []
+    assert _texts(store, tags, search, "is:done") == ["写周报 #urgent"]
+    
+    store.set_text(report.id, "写周报 #later")
+    store.set_text(fix.id, "修bug #urgent")
+    assert _texts(store, tags, search, "#urgent") == ["修bug #urgent"]
+    assert _texts(store, tags, search, "#later") == ["写周报 #later"]
+    assert "urgent" in tags.tags and report.id not in tags.tags["urgent"]
+    
+    store.rename_group("工作", "项目")
+    assert _texts(store, tags, search, "group:工作") == []
+    assert _texts(store, tags, search, "group:项目") == sorted(["写周报 #later", "修bug #urgent"])
+    
+    store.remove(fix.id)
+    assert _texts(store, tags, search, "#urgent") == []
+    assert "urgent" not in tags.tags
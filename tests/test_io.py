@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import io
+
+import pytest
+
+from todo_io import export_todos, import_todos, parse_columns, read_markdown, read_records
+from todo_store import Todo, TodoStore
+
+
+def _round_trip(todos, fmt):
+    """导出后再导入到新的TodoStore，返回导入后的任务"""
+    buffer = io.StringIO()
+    export_todos(todos, buffer, fmt)
+    buffer.seek(0)
+    store = TodoStore()
+    import_todos(store, read_records(buffer, fmt))
+    return list(store.iter_ordered())
+
+
+def test_markdown_round_trip_keeps_tag_lines_blank_lines_and_checklists():
+    todos = [
+        Todo(1, "买牛奶\n#urgent 今天", group="生活"),
+        Todo(2, "第一行\n\n第三行", completed=True, group="生活"),
+        Todo(3, "A\n- [ ] 子项", group="工作"),
+        Todo(4, "最后一条", group="工作"),
+    ]
+    imported = _round_trip(todos, "markdown")
+    assert [(t.group, t.text, t.completed) for t in imported] == [
+        ("生活", "买牛奶\n#urgent 今天", False),
+        ("生活", "第一行\n\n第三行", True),
+        ("工作", "A\n- [ ] 子项", False),
+        ("工作", "最后一条", False),
+    ]
+
+
+def test_markdown_headings_need_a_space_after_hashes():
+    text = "## 工作\n\n- [ ] 写周报\n\n#urgent\n- [x] 修bug\n"
+    records = list(read_markdown(io.StringIO(text)))
+    assert [(r["group"], r["text"], r["completed"]) for r in records] == [
+        ("工作", "写周报", False),
+        ("工作", "修bug", True),
+    ]
+
+
+def test_jsonl_reimport_skips_existing_tasks():
+    store = TodoStore()
+    for i in range(20):
+        store.add(f"任务{i}", "工作" if i % 2 else "生活")
+    buffer = io.StringIO()
+    export_todos(store.iter_ordered(), buffer, "jsonl")
+    
+    buffer.seek(0)
+    result = import_todos(store, read_records(buffer, "jsonl"))
+    assert (result.count, result.skipped) == (0, 20)
+    assert len(store) == 20
+    
+    # 导入到新的store时保留id、分组和顺序
+    buffer.seek(0)
+    other = TodoStore()
+    result = import_todos(other, read_records(buffer, "jsonl"))
+    assert result.count == 20
+    assert [(t.id, t.group, t.text) for t in other.iter_ordered()] == \
+        [(t.id, t.group, t.text) for t in store.iter_ordered()]
+
+
+def test_csv_import_with_column_mapping():
+    text = "分类,内容,状态\n工作,写周报,是\n,买菜,\n"
+    records = read_records(io.StringIO(text), "csv", parse_columns("group=分类, text=内容,completed=状态"))
+    store = TodoStore()
+    result = import_todos(store, records, default_group="默认分组")
+    assert result.count == 2
+    assert [(t.group, t.text, t.completed) for t in store.iter_ordered()] == [
+        ("工作", "写周报", True),
+        ("默认分组", "买菜", False),
+    ]
+
+
+def test_parse_columns_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        parse_columns("title=标题")
+    with pytest.raises(ValueError):
+        parse_columns("text")
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from todo_search import TodoSearchIndex, tokenize
+from todo_store import Todo, TodoStore
+
+
+class _Archive:
+    """只提供iter_all()的归档替身"""
+    def __init__(self, todos):
+        self.todos = todos
+    
+    def iter_all(self):
+        return iter(self.todos)
+
+
+def _index(texts, archived=()):
+    store = TodoStore()
+    todos = [store.add(text, "工作") for text in texts]
+    index = TodoSearchIndex(_Archive(list(archived)))
+    index.attach(store)
+    return store, index, todos
+
+
+def _texts(index, query):
+    results, total = index.search(query)
+    assert total == len(results)
+    return sorted(result.todo.text for result in results)
+
+
+def test_tokenize_splits_cjk_into_bigrams_and_latin_into_words():
+    assert tokenize("写周报 Review PR-12") == {"写周", "周报", "review", "pr", "12"}
+    # 只有一个字的段保留单字
+    assert tokenize("买 菜") == {"买", "菜"}
+    assert tokenize("!!!") == set()
+
+
+def test_single_cjk_character_matches_through_char_tokens():
+    _, index, _ = _index(["写周报", "买菜", "周末爬山"])
+    assert _texts(index, "周") == sorted(["写周报", "周末爬山"])
+    assert _texts(index, "周报") == ["写周报"]
+    assert _texts(index, "写报") == []
+
+
+def test_latin_terms_match_word_prefixes():
+    _, index, _ = _index(["Review docs https://example.com/guide", "reviewer meeting", "preview"])
+    assert _texts(index, "rev") == ["Review docs https://example.com/guide", "reviewer meeting"]
+    assert _texts(index, "exam") == ["Review docs https://example.com/guide"]
+    assert _texts(index, "view") == []
+
+
+def test_terms_with_punctuation_are_verified_against_the_text():
+    _, index, _ = _index(["v1.2 发布", "v2.1 发布", "C++ 入门", "C 语言"])
+    # 拆成多个词的关键词要按原文确认词序
+    assert _texts(index, "v1.2") == ["v1.2 发布"]
+    assert _texts(index, "c++") == ["C++ 入门"]
+    # 只有标点的关键词逐条比对
+    assert _texts(index, "++") == ["C++ 入门"]
+
+
+def test_index_follows_add_edit_and_remove():
+    store, index, (weekly, _) = _index(["写周报", "买菜"])
+    assert _texts(index, "周报") == ["写周报"]
+    store.add("周报模板", "生活")
+    assert _texts(index, "周报") == sorted(["写周报", "周报模板"])
+    store.set_text(weekly.id, "写月报")
+    assert _texts(index, "周报") == ["周报模板"]
+    assert _texts(index, "月报") == ["写月报"]
+    store.remove(weekly.id)
+    assert _texts(index, "月报") == []
+    assert "月报" not in index.postings
+
+
+def test_archived_copies_of_hot_tasks_are_not_duplicated():
+    archived = [Todo(1, "写周报（旧）", True, group="工作"), Todo(2, "归档的周报", True, group="工作")]
+    store = TodoStore([Todo(1, "写周报", group="工作")])
+    index = TodoSearchIndex(_Archive(archived))
+    index.attach(store)
+    results, total = index.search("周报")
+    assert total == 2
+    # 热数据在前，同一id只以热数据为准
+    assert [(result.todo.text, result.archived) for result in results] == [
+        ("写周报", False),
+        ("归档的周报", True),
+    ]
+    
+    # 归档重新读取后仍以热数据为准
+    index.invalidate_archive()
+    assert index.search("周报")[1] == 2
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from todo_storage import BackgroundWriter, DataLock, JournalStorage, open_storage
+from todo_store import TodoStore, legacy_id
+
+# 旧版数据：浮点时间戳id，最早的版本没有group和order
+LEGACY_TODOS = [
+    {"id": 1700000000.123456, "text": "写周报", "completed": False,
+     "created_at": "2023-11-15 06:13:20", "group": "工作", "order": 0},
+    {"id": 1700000001.5, "text": "买菜", "completed": True, "created_at": "2023-11-15 06:13:21"},
+    {"id": 1700000002.25, "text": "修bug", "completed": False,
+     "created_at": "2023-11-15 06:13:22", "group": "工作", "order": 1},
+]
+
+
+def _write_legacy(data_file):
+    with open(data_file, 'w', encoding='utf-8') as f:
+        json.dump(LEGACY_TODOS, f, ensure_ascii=False)
+
+
+def _texts(todos):
+    return sorted(todo.text for todo in todos)
+
+
+def test_journal_replay_ignores_and_truncates_torn_last_line(tmp_path):
+    data_file = str(tmp_path / "todo_data.json")
+    storage = JournalStorage(data_file)
+    store = TodoStore(storage.load())
+    first = store.add("写周报", "工作")
+    store.add("买菜", "生活")
+    storage.save(store)
+    store.set_text(first.id, "写月报")
+    storage.save(store)
+    storage.close()
+    # 模拟写到一半时崩溃
+    with open(storage.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"op": "put", "todo": {"id": 1, "te')
+    
+    storage = JournalStorage(data_file)
+    store = TodoStore(storage.load())
+    assert _texts(store) == ["买菜", "写月报"]
+    with open(storage.journal_file, 'rb') as f:
+        assert f.read().endswith(b"}\n")
+    
+    # 截断后追加的记录不会和残行粘在一起
+    store.add("修bug", "工作")
+    storage.save(store)
+    storage.close()
+    assert _texts(JournalStorage(data_file).load()) == ["买菜", "修bug", "写月报"]
+
+
+def test_journal_compaction_merges_into_snapshot(tmp_path):
+    data_file = str(tmp_path / "todo_data.json")
+    storage = JournalStorage(data_file)
+    store = TodoStore(storage.load())
+    keep = store.add("写周报", "工作")
+    gone = store.add("买菜", "生活")
+    storage.save(store)
+    store.remove(gone.id)
+    storage.save(store)
+    
+    storage.compact()
+    storage.close()
+    assert not os.path.exists(storage.journal_file)
+    assert not os.path.exists(storage.compacting_file)
+    with open(data_file, 'r', encoding='utf-8') as f:
+        assert [todo["id"] for todo in json.load(f)] == [keep.id]
+
+
+def test_json_to_sqlite_migration(tmp_path):
+    data_file = str(tmp_path / "todo_data.json")
+    _write_legacy(data_file)
+    storage = open_storage(data_file, "sqlite")
+    assert os.path.exists(str(tmp_path / "todo_data.db"))
+    # 原文件保留作为备份
+    assert os.path.exists(data_file)
+    assert storage.group_counts() == {"工作": (2, 0), "默认分组": (1, 1)}
+    assert [todo.text for todo in storage.load_group("工作")] == ["写周报", "修bug"]
+    assert all(isinstance(todo.id, int) for todo in storage.load())
+    
+    # 懒加载的store写回后，再次打开不会重新迁移
+    store = TodoStore()
+    store.set_lazy(storage.group_counts())
+    store.load_group("工作", storage.load_group("工作"))
+    store.add("开会", "工作")
+    storage.save(store)
+    storage.close()
+    storage = open_storage(data_file, "sqlite")
+    assert [todo.text for todo in storage.load_group("工作")] == ["写周报", "修bug", "开会"]
+    assert storage.group_counts()["默认分组"] == (1, 1)
+    storage.close()
+
+
+def test_json_to_shards_migration_includes_unmerged_journal(tmp_path):
+    data_file = str(tmp_path / "todo_data.json")
+    _write_legacy(data_file)
+    # 从日志模式切换过来时，日志中尚未合并的变更也要迁移
+    with open(str(tmp_path / "todo_data.journal"), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"op": "put", "todo": {
+            "id": 5, "text": "开会", "completed": False, "created_at": "2023-11-16 09:00:00",
+            "group": "工作", "order": 2}}, ensure_ascii=False) + "\n")
+    
+    storage = open_storage(data_file, "sharded")
+    manifest_file = str(tmp_path / "todo_data" / "manifest.json")
+    assert os.path.exists(manifest_file)
+    assert storage.group_counts() == {"工作": (3, 0), "默认分组": (1, 1)}
+    assert [todo.text for todo in storage.load_group("工作")] == ["写周报", "修bug", "开会"]
+    
+    # 只重写有变更的分组
+    store = TodoStore()
+    store.set_lazy(storage.group_counts())
+    store.load_group("默认分组", storage.load_group("默认分组"))
+    work_file = os.path.join(str(tmp_path / "todo_data"), storage.manifest["groups"]["工作"]["file"])
+    work_mtime = os.path.getmtime(work_file)
+    store.add("取快递", "默认分组")
+    storage.save(store)
+    assert os.path.getmtime(work_file) == work_mtime
+    
+    reopened = open_storage(data_file, "sharded")
+    assert reopened.group_counts() == {"工作": (3, 0), "默认分组": (2, 1)}
+    assert _texts(reopened.load()) == sorted(["写周报", "修bug", "开会", "买菜", "取快递"])
+
+
+def test_float_ids_are_rekeyed_and_persisted_once(tmp_path):
+    for mode in ("json", "journal"):
+        data_file = str(tmp_path / f"{mode}.json")
+        _write_legacy(data_file)
+        storage = open_storage(data_file, mode)
+        store = TodoStore(storage.load())
+        expected = sorted(legacy_id(todo["id"]) for todo in LEGACY_TODOS)
+        assert sorted(todo.id for todo in store) == expected
+        assert store.has_changes()
+        storage.save(store)
+        storage.close()
+        
+        storage = open_storage(data_file, mode)
+        store = TodoStore(storage.load())
+        assert sorted(todo.id for todo in store) == expected
+        # 第二次载入时已经是整数id，不再产生变更
+        assert not store.has_changes()
+        # 新分配的id排在旧任务之后
+        assert store.add("新任务", "工作").id > max(expected)
+        storage.close()
+
+
+def test_merging_into_an_unloaded_shard_is_refused(tmp_path):
+    data_file = str(tmp_path / "todo_data.json")
+    storage = open_storage(data_file, "sharded")
+    store = TodoStore()
+    store.set_lazy(storage.group_counts())
+    for group, texts in (("A", ["a1"]), ("B", ["b1", "b2"])):
+        store.load_group(group, [])
+        for text in texts:
+            store.add(text, group)
+    storage.save(store)
+    
+    # 新会话只载入了A，B只存在于数据中
+    storage = open_storage(data_file, "sharded")
+    store = TodoStore()
+    store.set_lazy(storage.group_counts())
+    store.load_group("A", storage.load_group("A"))
+    with pytest.raises(ValueError):
+        store.rename_group("A", "B")
+    assert store.group_size("A") == 1
+    
+    # 先载入B再合并，B原有的任务不会被覆盖
+    store.load_group("B", storage.load_group("B"))
+    store.rename_group("A", "B")
+    storage.save(store)
+    reopened = open_storage(data_file, "sharded")
+    assert reopened.group_counts() == {"B": (3, 0)}
+    assert [todo.text for todo in reopened.load_group("B")] == ["b1", "b2", "a1"]
+
+
+def test_data_lock_is_exclusive_until_released(tmp_path):
+    data_file = str(tmp_path / "todo_data.json")
+    held = DataLock(data_file)
+    assert held.acquire()
+    other = DataLock(data_file)
+    assert not other.acquire()
+    assert not other.acquire(timeout=0.1)
+    held.release()
+    assert other.acquire()
+    other.release()
+
+
+def test_background_writer_waits_while_ui_holds_the_lock():
+    writes = []
+    writer = BackgroundWriter(delay=0)
+    writer.register("data", lambda: writes.append(time.monotonic()))
+    assert writer.try_lock()
+    writer.mark_dirty("data")
+    time.sleep(0.2)
+    assert writes == []
+    writer.unlock()
+    time.sleep(0.2)
+    assert len(writes) == 1
+    # 后台写盘期间界面线程取不到锁
+    started = threading.Event()
+    writer.register("data", lambda: (started.set(), time.sleep(0.3)))
+    writer.mark_dirty("data")
+    assert started.wait(1)
+    assert not writer.try_lock()
+    writer.stop()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from todo_store import Todo, TodoStore
+
+
+def _store(count, group="工作"):
+    store = TodoStore()
+    for i in range(count):
+        store.add(f"任务{i}", group)
+    store.pop_changes()
+    return store
+
+
+def _texts(store, group="工作"):
+    return [todo.text for todo in store.group_todos(group)]
+
+
+def _reloaded(store):
+    """按保存的记录重新载入，顺序只取决于order"""
+    return TodoStore([Todo.from_dict(data) for data in store.snapshot()])
+
+
+def test_move_changes_only_the_moved_task():
+    store = _store(5)
+    moved = store.group_todos("工作")[4]
+    assert store.move(moved.id, 1)
+    assert _texts(store) == ["任务0", "任务4", "任务1", "任务2", "任务3"]
+    assert list(store.pop_changes()) == [moved.id]
+    todos = store.group_todos("工作")
+    assert todos[0].order < moved.order < todos[2].order
+    assert _texts(_reloaded(store)) == _texts(store)
+
+
+def test_move_up_and_down_stay_within_group():
+    store = _store(3)
+    store.add("别的分组", "生活")
+    first, _, last = store.group_todos("工作")
+    assert not store.move_up(first.id)
+    assert not store.move_down(last.id)
+    assert store.move_down(first.id)
+    assert _texts(store) == ["任务1", "任务0", "任务2"]
+    assert store.index_of(first.id) == 1
+
+
+def test_rebalance_when_neighbours_run_out_of_room(monkeypatch):
+    store = _store(20)
+    rebalanced = []
+    original = TodoStore._rebalance
+    monkeypatch.setattr(TodoStore, "_rebalance",
+                        lambda self, ids, index: (rebalanced.append(index), original(self, ids, index)))
+    # 反复插到同一位置（order为1.0的任务之后），两邻居之间的浮点间隔很快用尽
+    for _ in range(200):
+        last = store.group_todos("工作")[-1]
+        store.move(last.id, 2)
+    assert rebalanced
+    orders = [todo.order for todo in store.group_todos("工作")]
+    assert orders == sorted(orders)
+    assert len(set(orders)) == len(orders)
+    assert _texts(_reloaded(store)) == _texts(store)
+    # 重新铺开的只是附近一小段，每次移动改动的任务数远少于整个分组
+    store.pop_changes()
+    last = store.group_todos("工作")[-1]
+    store.move(last.id, 2)
+    assert len(store.pop_changes()) < 20
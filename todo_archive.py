@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 归档
+把较早的已完成任务移出热数据，追加写入todo_archive/下的gzip分段文件（每行一个任务），
+manifest.json记录每个分段的文件名和各分组条数，查看时才按分组分页读出。
+新分段和清单的修改先登记在内存中，由后台写盘线程在写数据文件之前调用flush()写出
+"""
+import copy
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from todo_store import Todo, legacy_id
+from todo_storage import write_json_atomic
+
+
+class TodoArchive:
+    """只追加的压缩归档。界面线程只登记新分段和清单的修改，flush()在后台线程写盘"""
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self.manifest_file = os.path.join(archive_dir, "manifest.json")
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"version": 1, "segments": []}
+        self._pending = {}  # 尚未写盘的分段：文件名 -> 任务记录列表，写盘前从这里读
+        self._dirty = False
+        self._lock = threading.Lock()
+    
+    def count(self, group):
+        """分组的归档条数（只读清单）"""
+        return sum(segment["groups"].get(group, 0) for segment in self.manifest["segments"])
+    
+    def append(self, todos):
+        """把一批任务登记为新的分段（不做磁盘IO），返回条数"""
+        if not todos:
+            return 0
+        records = [todo.to_dict() for todo in todos]
+        groups = {}
+        for todo in todos:
+            groups[todo.group] = groups.get(todo.group, 0) + 1
+        with self._lock:
+            file_name = f"segment_{len(self.manifest['segments']) + 1:05d}.jsonl.gz"
+            self.manifest["segments"].append({
+                "file": file_name,
+                "count": len(todos),
+                "groups": groups,
+                # 分段内记录的分组名 -> 当前分组名（分组重命名后不改写分段）
+                "names": {group: group for group in groups},
+                "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+            self._pending[file_name] = records
+            self._dirty = True
+        return len(todos)
+    
+    def has_changes(self):
+        """是否有尚未写盘的分段或清单修改"""
+        return self._dirty
+    
+    def flush(self):
+        """写出登记的分段，最后更新清单（后台线程调用）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            pending = list(self._pending.items())
+            manifest = copy.deepcopy(self.manifest)
+        try:
+            if pending:
+                os.makedirs(self.archive_dir, exist_ok=True)
+            for file_name, records in pending:
+                self._write_segment(file_name, records)
+            # 分段落盘后再更新清单
+            write_json_atomic(self.manifest_file, manifest)
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            raise
+        with self._lock:
+            for file_name, _ in pending:
+                self._pending.pop(file_name, None)
+    
+    def _write_segment(self, file_name, records):
+        path = os.path.join(self.archive_dir, file_name)
+        with open(path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                for record in records:
+                    f.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+    
+    def _records(self, segment):
+        """逐条读出分段中的记录，尚未写盘的分段直接取内存中的"""
+        records = self._pending.get(segment["file"])
+        if records is not None:
+            for record in records:
+                yield dict(record)
+            return
+        path = os.path.join(self.archive_dir, segment["file"])
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+    
+    def iter_group(self, group):
+        """按归档顺序逐条读出分组的任务，只打开含该分组的分段"""
+        for segment in list(self.manifest["segments"]):
+            if not segment["groups"].get(group):
+                continue
+            names = segment["names"]
+            for data in self._records(segment):
+                if names.get(data["group"], data["group"]) == group:
+                    data["group"] = group
+                    # 与热数据一样把旧版浮点id换成整数id
+                    data["id"] = legacy_id(data["id"])
+                    yield Todo.from_dict(data)
+    
+    def iter_all(self):
+        """按归档顺序逐条读出全部任务（分组名换成当前名称），用于建立搜索索引"""
+        for segment in list(self.manifest["segments"]):
+            names = segment["names"]
+            for data in self._records(segment):
+                data["group"] = names.get(data["group"], data["group"])
+                data["id"] = legacy_id(data["id"])
+                yield Todo.from_dict(data)
+    
+    def move_group(self, old_name, new_name):
+        """分组重命名或删除（并入其他分组）时同步更新清单（由flush()写盘）"""
+        with self._lock:
+            for segment in self.manifest["segments"]:
+                count = segment["groups"].pop(old_name, 0)
+                if not count:
+                    continue
+                segment["groups"][new_name] = segment["groups"].get(new_name, 0) + count
+                for stored, current in segment["names"].items():
+                    if current == old_name:
+                        segment["names"][stored] = new_name
+                self._dirty = True
+
+
+def archive_completed(store, archive, days, group=None):
+    """把完成超过days天的任务移入归档，返回归档条数（调用方负责保存store）
+    没有完成时间的已完成任务（旧数据、导入的任务）记为现在完成，从现在开始计时"""
+    now = int(time.time())
+    cutoff = now - days * 86400
+    todos = store.group_todos(group) if group is not None else store.to_list()
+    old = []
+    for todo in todos:
+        if not todo.completed:
+            continue
+        finished = todo.completed_time
+        if finished is None:
+            store.stamp_completed(todo.id, now)
+        elif finished < cutoff:
+            old.append(todo)
+    # 调用方先写归档（archive.flush()）再写数据文件；若在两者之间退出，读取归档时会跳过仍在热数据中的任务
+    archive.append(old)
+    for todo in old:
+        store.remove(todo.id)
+    return len(old)
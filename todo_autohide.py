@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 侧边自动隐藏
+靠<Enter>/<Leave>事件驱动：鼠标在窗口内时不做任何检查；离开窗口后只要鼠标还停在屏幕
+右边缘附近，就按自适应间隔查询鼠标位置，离开边缘即隐藏并停止查询。
+隐藏后由窗口露出的几像素和贴着屏幕右边缘的一条细感应条接收<Enter>，鼠标碰到就展开。
+"""
+import os
+import time
+import tkinter as tk
+
+SENSOR_WIDTH = 2  # 感应条宽度（像素）
+LEAVE_DELAY = 30  # 收到<Leave>后稍等再确认，鼠标只是移进子控件时不必查询
+MIN_INTERVAL = 100  # 鼠标停在边缘附近时的查询间隔（毫秒），鼠标不动时逐步放慢
+MAX_INTERVAL = 400
+STATS_INTERVAL = 60000  # 统计唤醒次数时的输出间隔（毫秒）
+
+
+class EdgeAutoHide:
+    """窗口贴在屏幕右侧时的自动隐藏/展开"""
+    def __init__(self, root, on_hide, on_show, threshold=20):
+        self.root = root
+        self.on_hide = on_hide
+        self.on_show = on_show
+        self.threshold = threshold  # 鼠标距屏幕右边缘多少像素内算"靠近边缘"
+        self.enabled = False
+        self.paused = False
+        self.hidden = False
+        self.sensor = None
+        self._job = None
+        self._interval = MIN_INTERVAL
+        self._last_pointer = None
+        # 设置环境变量TODO_WAKEUP_STATS=1时统计定时器唤醒次数，每分钟输出一次（空闲时为0）
+        self.stats = bool(os.environ.get("TODO_WAKEUP_STATS"))
+        self.wakeups = 0
+        self._stats_start = time.monotonic()
+        if self.stats:
+            root.after(STATS_INTERVAL, self._report_wakeups)
+        
+        root.bind("<Enter>", self.on_enter, add="+")
+        root.bind("<Leave>", self.on_leave, add="+")
+    
+    def start(self):
+        """开启自动隐藏（窗口已移到右边缘）"""
+        self.enabled = True
+        self.paused = False
+        self._schedule(0)
+    
+    def stop(self):
+        """关闭自动隐藏，取消所有定时器（窗口由调用方恢复显示）"""
+        self.enabled = False
+        self.hidden = False
+        self._cancel()
+        self._hide_sensor()
+    
+    def pause(self):
+        """窗口隐藏到托盘期间不再唤醒"""
+        self.paused = True
+        self._cancel()
+        self._hide_sensor()
+    
+    def resume(self):
+        """从托盘恢复"""
+        self.paused = False
+        if self.enabled:
+            if self.hidden:
+                self._show()
+            self._schedule(0)
+    
+    @property
+    def active(self):
+        return self.enabled and not self.paused
+    
+    def on_enter(self, event):
+        """鼠标进入窗口（或隐藏时露出的部分、感应条）"""
+        if not self.active:
+            return
+        self._cancel()
+        if self.hidden:
+            self._show()
+            # 展开后鼠标可能在窗口上下方的边缘处，交给查询确认
+            self._schedule(MIN_INTERVAL)
+    
+    def on_leave(self, event):
+        """只处理顶层窗口的<Leave>，子控件之间移动时的事件忽略"""
+        if not self.active or self.hidden or event.widget is not self.root:
+            return
+        self._schedule(LEAVE_DELAY)
+    
+    def _schedule(self, delay):
+        self._cancel()
+        self._job = self.root.after(delay, self._check)
+    
+    def _cancel(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+    
+    def _check(self):
+        """查询一次鼠标位置：在窗口内时停止查询，靠近边缘时继续，否则隐藏"""
+        self._job = None
+        self._count_wakeup()
+        if not self.active or self.hidden:
+            return
+        try:
+            x, y = self.root.winfo_pointerxy()
+            widget = self.root.winfo_containing(x, y)
+            if widget is not None and widget.winfo_toplevel() is not self.sensor:
+                # 鼠标在本程序的窗口上，等下一次<Leave>
+                return
+            if x >= self.root.winfo_screenwidth() - self.threshold:
+                # 鼠标不动时逐步放慢，移动时恢复
+                if (x, y) == self._last_pointer:
+                    self._interval = min(self._interval * 2, MAX_INTERVAL)
+                else:
+                    self._interval = MIN_INTERVAL
+                self._last_pointer = (x, y)
+                self._job = self.root.after(self._interval, self._check)
+                return
+        except Exception as e:
+            print(f"检查自动隐藏失败: {e}")
+            return
+        self._last_pointer = None
+        self._interval = MIN_INTERVAL
+        self.hidden = True
+        self.on_hide()
+        self._show_sensor()
+    
+    def _show(self):
+        self.hidden = False
+        self._hide_sensor()
+        self.on_show()
+    
+    def _show_sensor(self):
+        """贴着屏幕右边缘放一条几乎透明的置顶细条，鼠标碰到时展开窗口"""
+        if self.sensor is None:
+            self.sensor = tk.Toplevel(self.root, bg="#2196F3", cursor="sb_left_arrow")
+            self.sensor.overrideredirect(True)
+            try:
+                self.sensor.attributes("-topmost", True)
+                self.sensor.attributes("-alpha", 0.01)
+            except tk.TclError:
+                pass
+            self.sensor.bind("<Enter>", self.on_enter)
+        screen_width = self.root.winfo_screenwidth()
+        screen_height = self.root.winfo_screenheight()
+        self.sensor.geometry(f"{SENSOR_WIDTH}x{screen_height}+{screen_width - SENSOR_WIDTH}+0")
+        self.sensor.deiconify()
+    
+    def _hide_sensor(self):
+        if self.sensor is not None:
+            self.sensor.withdraw()
+    
+    def _count_wakeup(self):
+        if self.stats:
+            self.wakeups += 1
+    
+    def _report_wakeups(self):
+        """固定间隔输出唤醒次数（只在统计时运行，本身不计入）"""
+        elapsed = time.monotonic() - self._stats_start
+        print(f"自动隐藏: {elapsed:.0f}秒内唤醒{self.wakeups}次（每分钟{self.wakeups * 60 / elapsed:.1f}次）")
+        self.wakeups = 0
+        self._stats_start = time.monotonic()
+        self.root.after(STATS_INTERVAL, self._report_wakeups)
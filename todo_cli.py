@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 命令行
+不导入tkinter、PIL和pystray，直接读写与界面相同的数据文件，供脚本和快捷键启动器使用：
+    python todo_cli.py add 买牛奶 -g 生活
+    python todo_cli.py list
+    python todo_cli.py done 2
+    python todo_cli.py move 5 1
+    python todo_cli.py groups
+"""
+import argparse
+import json
+import os
+import sys
+
+from todo_store import DEFAULT_GROUP, TodoStore
+from todo_storage import DataLock, open_storage, write_json_atomic
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(BASE_DIR, "todo_data.json")
+CONFIG_FILE = os.path.join(BASE_DIR, "todo_config.json")
+
+
+def load_config():
+    """读取界面的配置文件，不存在或损坏时返回空配置"""
+    if not os.path.exists(CONFIG_FILE):
+        return {}
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"加载配置失败: {e}", file=sys.stderr)
+        return {}
+
+
+class TodoSession:
+    """一次命令行调用：只载入用到的分组，有修改时同步保存
+    writable为False时（只读命令）不保存任何内容，包括旧数据的id迁移"""
+    def __init__(self, config, writable=True):
+        self.config = config
+        self.writable = writable
+        self.storage = open_storage(DATA_FILE, config.get("storage", "json"))
+        if self.storage.lazy:
+            self.store = TodoStore()
+            self.store.set_lazy(self.storage.group_counts())
+        else:
+            self.store = TodoStore(self.storage.load())
+    
+    def group(self, name):
+        """载入并返回分组内按顺序排列的任务"""
+        if not self.store.is_loaded(name):
+            self.store.load_group(name, self.storage.load_group(name))
+        return self.store.group_todos(name)
+    
+    def groups(self):
+        """配置中的分组在前，其后是只存在于数据中的分组"""
+        names = list(self.config.get("groups", [DEFAULT_GROUP]))
+        for name in self.store.group_names():
+            if name not in names:
+                names.append(name)
+        return names
+    
+    def close(self):
+        """保存修改（包括旧数据的id迁移）并关闭存储"""
+        if self.writable and self.store.has_changes():
+            self.storage.save(self.store)
+        self.storage.close()
+    
+    def remember_group(self, name):
+        """新分组写入配置，界面下次启动时可以看到"""
+        groups = self.config.get("groups", [DEFAULT_GROUP])
+        if name in groups:
+            return
+        self.config["groups"] = list(groups) + [name]
+        write_json_atomic(CONFIG_FILE, self.config)
+
+
+def _task_at(todos, number):
+    """按list输出的序号（从1开始）取任务"""
+    if not 1 <= number <= len(todos):
+        raise SystemExit(f"序号超出范围: {number}（共{len(todos)}条）")
+    return todos[number - 1]
+
+
+def _print_todos(todos, show_completed):
+    for number, todo in enumerate(todos, 1):
+        if todo.completed and not show_completed:
+            continue
+        mark = "x" if todo.completed else " "
+        lines = todo.text.split("\n")
+        print(f"{number:>3}. [{mark}] {lines[0]}")
+        for line in lines[1:]:
+            print(f"          {line}")
+
+
+def cmd_add(session, args):
+    text = " ".join(args.text).strip()
+    if not text:
+        raise SystemExit("请输入待办事项内容")
+    session.group(args.group)
+    session.store.add(text, args.group)
+    session.remember_group(args.group)
+    print(f"已添加到'{args.group}': {text}")
+
+
+def cmd_list(session, args):
+    _print_todos(session.group(args.group), args.all)
+    total, completed = session.store.counts(args.group)
+    print(f"总计: {total} | 已完成: {completed} | 未完成: {total - completed}")
+
+
+def cmd_done(session, args):
+    todos = session.group(args.group)
+    for number in args.numbers:
+        todo = _task_at(todos, number)
+        # 再次执行done不会把已完成的任务改回未完成
+        if args.undo == todo.completed:
+            session.store.toggle(todo.id)
+        print(f"{'已恢复' if args.undo else '已完成'}: {todo.text.splitlines()[0]}")
+
+
+def cmd_move(session, args):
+    todos = session.group(args.group)
+    todo = _task_at(todos, args.number)
+    target = min(max(args.to, 1), len(todos))
+    session.store.move(todo.id, target - 1)
+    print(f"已移动到第{target}位: {todo.text.splitlines()[0]}")
+
+
+def cmd_groups(session, args):
+    current = session.config.get("current_group", DEFAULT_GROUP)
+    for name in session.groups():
+        total, completed = session.store.counts(name)
+        print(f"{'*' if name == current else ' '} {name}  ({total - completed}/{total})")
+
+
+def cmd_import(session, args):
+    from todo_io import import_file, parse_columns
+    try:
+        columns = parse_columns(args.columns) if args.columns else None
+    except ValueError as e:
+        raise SystemExit(str(e))
+    result = import_file(session.store, args.file, columns=columns, default_group=args.group,
+                         on_group=lambda group: (session.group(group), session.remember_group(group)))
+    print(result)
+
+
+def cmd_export(session, args):
+    from todo_io import export_file
+    for name in session.groups():
+        session.group(name)
+    print(f"已导出 {export_file(session.store.iter_ordered(), args.file)} 条任务")
+
+
+def _args_add(p):
+    p.add_argument("text", nargs="+", help="任务内容")
+
+
+def _args_list(p):
+    p.add_argument("-a", "--all", action="store_true", help="同时列出已完成的任务")
+
+
+def _args_done(p):
+    p.add_argument("numbers", nargs="+", type=int, metavar="序号")
+    p.add_argument("-u", "--undo", action="store_true", help="改回未完成")
+
+
+def _args_move(p):
+    p.add_argument("number", type=int, metavar="序号")
+    p.add_argument("to", type=int, metavar="目标位置")
+
+
+def _args_file(p):
+    p.add_argument("file")
+
+
+def _args_import(p):
+    p.add_argument("file")
+    p.add_argument("-c", "--columns",
+                   help="CSV的列名映射，如 text=内容,group=分类,completed=状态,created_at=时间"
+                        "（默认列名为 group,text,completed,created_at）")
+
+
+# 会修改数据的命令：界面运行时拒绝执行，否则界面下次保存时会覆盖掉这些修改
+WRITE_COMMANDS = {"add", "done", "move", "import"}
+
+# 命令 -> (处理函数, 说明, 添加参数的函数)
+COMMANDS = {
+    "add": (cmd_add, "添加任务", _args_add),
+    "list": (cmd_list, "列出分组内的任务", _args_list),
+    "done": (cmd_done, "标记任务完成（序号见list）", _args_done),
+    "move": (cmd_move, "把任务移动到指定位置", _args_move),
+    "groups": (cmd_groups, "列出分组及未完成/总数", None),
+    "import": (cmd_import, "从JSON Lines/CSV/Markdown清单导入", _args_import),
+    "export": (cmd_export, "按扩展名导出全部任务", _args_file),
+}
+
+
+def build_parser(default_group, command=None):
+    """command已知时只构建这一个子命令（argparse构建每个子解析器都要几毫秒）"""
+    parser = argparse.ArgumentParser(prog="todo", description="桌面待办事项命令行")
+    commands = parser.add_subparsers(dest="command", metavar="命令")
+    commands.required = True
+    for name, (func, help_text, add_arguments) in COMMANDS.items():
+        if command is not None and name != command:
+            continue
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("-g", "--group", default=default_group,
+                       help=f"分组（默认为界面当前分组: {default_group}）")
+        if add_arguments:
+            add_arguments(p)
+        p.set_defaults(func=func)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    config = load_config()
+    command = argv[0] if argv and argv[0] in COMMANDS else None
+    args = build_parser(config.get("current_group", DEFAULT_GROUP), command).parse_args(argv)
+    writable = args.command in WRITE_COMMANDS
+    lock = DataLock(DATA_FILE)
+    if writable and not lock.acquire():
+        raise SystemExit("桌面待办正在运行（或另一个命令正在写入），请在界面中操作，或退出界面后再试")
+    try:
+        session = TodoSession(config, writable)
+        try:
+            args.func(session, args)
+        finally:
+            session.close()
+    finally:
+        lock.release()
+
+
+if __name__ == "__main__":
+    main()
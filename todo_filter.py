@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 标签与筛选
+任务文本中的#标签在添加、编辑时解析，和分组、完成状态一起维护成"条件 -> 任务id集合"的索引。
+筛选条件（如 group:工作 #urgent is:open）编译为这些集合的交集，切换视图的开销只和结果数量有关。
+"""
+import shlex
+
+from todo_text import parse_tags
+
+# is:后可用的状态
+_STATUS = {"open": False, "todo": False, "done": True, "completed": True}
+
+
+class TodoFilter:
+    """编译后的筛选条件：每一项为(类型, 值)，类型为group/tag/status/text"""
+    def __init__(self, query, include, exclude):
+        self.query = query
+        self.include = include  # 必须满足的条件
+        self.exclude = exclude  # 前面加"-"的条件，满足的任务排除
+
+
+def compile_filter(query):
+    """解析筛选条件：group:分组  #标签（或tag:标签）  is:open/done  其余词按全文搜索，前加"-"表示排除"""
+    try:
+        words = shlex.split(query)
+    except ValueError as e:
+        raise ValueError(f"筛选条件格式错误: {e}")
+    include = []
+    exclude = []
+    for word in words:
+        target = include
+        if word.startswith("-") and len(word) > 1:
+            target = exclude
+            word = word[1:]
+        key, sep, value = word.partition(":")
+        key = key.lower()
+        if word.startswith("#") and len(word) > 1:
+            target.append(("tag", word[1:].lower()))
+        elif sep and key == "tag" and value:
+            target.append(("tag", value.lstrip("#").lower()))
+        elif sep and key == "group" and value:
+            target.append(("group", value))
+        elif sep and key == "is":
+            if value.lower() not in _STATUS:
+                raise ValueError(f"未知的状态: {value}（可用 is:open 或 is:done）")
+            target.append(("status", _STATUS[value.lower()]))
+        else:
+            target.append(("text", word))
+    if not include and not exclude:
+        raise ValueError("筛选条件为空")
+    return TodoFilter(query, include, exclude)
+
+
+class TagIndex:
+    """标签、分组和完成状态 -> 任务id集合，随TodoStore的变更增量维护"""
+    def __init__(self):
+        self.store = None
+        self.built = False
+        self.tags = {}       # 标签 -> {任务id}
+        self.groups = {}     # 分组 -> {任务id}
+        self.status = {False: set(), True: set()}  # 是否已完成 -> {任务id}
+        self.all = set()
+        self._tags_of = {}   # 任务id -> 建索引时的标签（编辑后用来删除旧标签）
+        self._group_of = {}  # 任务id -> 建索引时的分组
+    
+    def attach(self, store):
+        """换成新的TodoStore，索引在下次使用时重建"""
+        if self.store is not None and self._on_change in self.store.observers:
+            self.store.observers.remove(self._on_change)
+        self.store = store
+        store.observers.append(self._on_change)
+        self.built = False
+    
+    def ensure_built(self):
+        if self.built:
+            return
+        self.tags = {}
+        self.groups = {}
+        self.status = {False: set(), True: set()}
+        self.all = set()
+        self._tags_of = {}
+        self._group_of = {}
+        for todo in self.store.to_list():
+            self._add(todo)
+        self.built = True
+    
+    def _on_change(self, event, todos):
+        if not self.built:
+            return
+        if event == "reset":
+            self.built = False
+            return
+        for todo in todos:
+            if event == "add":
+                self._add(todo)
+            elif event == "remove":
+                self._remove(todo.id)
+            elif event == "edit":
+                self._set_tags(todo.id, parse_tags(todo.text))
+            elif event == "toggle":
+                self.status[not todo.completed].discard(todo.id)
+                self.status[todo.completed].add(todo.id)
+            elif event == "regroup":
+                self._discard(self.groups, self._group_of[todo.id], todo.id)
+                self._group_of[todo.id] = todo.group
+                self.groups.setdefault(todo.group, set()).add(todo.id)
+    
+    def _add(self, todo):
+        todo_id = todo.id
+        self.all.add(todo_id)
+        self.status[todo.completed].add(todo_id)
+        self._group_of[todo_id] = todo.group
+        self.groups.setdefault(todo.group, set()).add(todo_id)
+        self._tags_of[todo_id] = ()
+        self._set_tags(todo_id, parse_tags(todo.text))
+    
+    def _remove(self, todo_id):
+        if todo_id not in self.all:
+            return
+        self.all.discard(todo_id)
+        self.status[False].discard(todo_id)
+        self.status[True].discard(todo_id)
+        self._discard(self.groups, self._group_of.pop(todo_id), todo_id)
+        self._set_tags(todo_id, ())
+        del self._tags_of[todo_id]
+    
+    def _set_tags(self, todo_id, tags):
+        old = self._tags_of.get(todo_id, ())
+        if tags == old:
+            return
+        for tag in old:
+            self._discard(self.tags, tag, todo_id)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(todo_id)
+        self._tags_of[todo_id] = tags
+    
+    @staticmethod
+    def _discard(index, key, todo_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(todo_id)
+            if not ids:
+                del index[key]
+    
+    def _ids_for(self, condition, search):
+        kind, value = condition
+        if kind == "tag":
+            return self.tags.get(value, set())
+        if kind == "group":
+            return self.groups.get(value, set())
+        if kind == "status":
+            return self.status[value]
+        # 全文条件借用搜索索引，只保留热数据中的任务
+        return {todo_id for todo_id in search.matching_ids(value) if todo_id in self.all}
+    
+    def apply(self, todo_filter, search=None):
+        """返回满足条件的任务id集合：按集合大小从小到大求交集，再去掉排除的"""
+        self.ensure_built()
+        sets = [self._ids_for(condition, search) for condition in todo_filter.include]
+        if sets:
+            sets.sort(key=len)
+            ids = set(sets[0])
+            for other in sets[1:]:
+                ids &= other
+                if not ids:
+                    return ids
+        else:
+            ids = set(self.all)
+        for condition in todo_filter.exclude:
+            excluded = self._ids_for(condition, search)
+            if len(excluded) > len(ids):
+                ids = {todo_id for todo_id in ids if todo_id not in excluded}
+            else:
+                ids -= excluded
+        return ids
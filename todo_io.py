@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 批量导入导出
+支持JSON Lines、CSV和Markdown清单（- [ ] / - [x]），逐条流式读写，
+导入时按批提交到TodoStore，最后只保存和刷新一次
+"""
+import csv
+import json
+import os
+import re
+import time
+
+from todo_store import DEFAULT_GROUP, Todo, parse_time
+
+# 任务字段 -> CSV默认列名
+CSV_COLUMNS = {"group": "group", "text": "text", "completed": "completed", "created_at": "created_at"}
+
+# Markdown标题：行首1-6个#后跟空白（"#标签"不算）
+_HEADING_RE = re.compile(r"#{1,6}\s")
+
+_TRUE_VALUES = {"1", "true", "yes", "y", "x", "done", "✓", "✔", "是", "已完成"}
+
+
+def detect_format(path):
+    """根据扩展名判断文件格式"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    if ext in (".md", ".markdown", ".txt"):
+        return "markdown"
+    raise ValueError(f"不支持的文件格式: {ext}")
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _TRUE_VALUES
+
+
+def read_jsonl(f):
+    """逐行读取JSON Lines记录"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_csv(f, columns=None):
+    """逐行读取CSV记录，columns为任务字段 -> 列名的映射"""
+    columns = dict(CSV_COLUMNS, **(columns or {}))
+    for row in csv.DictReader(f):
+        yield {field: row.get(column) for field, column in columns.items()}
+
+
+def read_markdown(f):
+    """读取Markdown清单：标题作为分组，缩进两格的续行（含空行）并入上一条任务"""
+    group = None
+    record = None
+    for line in f:
+        line = line.rstrip("\r\n")
+        if record and line.startswith("  "):
+            # 续行先于标题和清单项判断，任务文本中的"#标签"、"- [ ]"不会被当成新的一项
+            record["text"] += "\n" + line[2:]
+            continue
+        stripped = line.strip()
+        if _HEADING_RE.match(line):
+            if record:
+                yield record
+                record = None
+            group = line.lstrip("#").strip() or None
+        elif stripped[:6].lower() in ("- [ ] ", "- [x] ", "* [ ] ", "* [x] "):
+            if record:
+                yield record
+            record = {"text": stripped[6:], "completed": stripped[3].lower() == "x", "group": group}
+        elif record and not stripped:
+            yield record
+            record = None
+    if record:
+        yield record
+
+
+def parse_columns(spec):
+    """'字段=列名,...' -> 任务字段到CSV列名的映射，例如 text=内容,group=分类"""
+    columns = {}
+    for item in spec.split(","):
+        field, sep, column = item.partition("=")
+        field = field.strip()
+        if not sep or field not in CSV_COLUMNS or not column.strip():
+            raise ValueError(f"列映射格式错误: {item}（可用字段: {', '.join(CSV_COLUMNS)}）")
+        columns[field] = column.strip()
+    return columns
+
+
+def _number(value):
+    """JSON中的数字原样返回，其他（缺失、字符串、布尔）返回None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def read_records(f, fmt, columns=None):
+    """按格式读取记录"""
+    if fmt == "jsonl":
+        return read_jsonl(f)
+    if fmt == "csv":
+        return read_csv(f, columns)
+    return read_markdown(f)
+
+
+def record_to_todo(record, default_group=DEFAULT_GROUP):
+    """把一条导入记录转换为Todo，缺少的字段取默认值
+    JSON Lines导出的记录保留id和order，再次导入同一文件时已有的任务会被跳过"""
+    text = (record.get("text") or "").strip()
+    if not text:
+        return None
+    created = parse_time(record.get("created_at")) or int(time.time())
+    completed = _to_bool(record.get("completed", False))
+    # JSON Lines导出的完成时间一并导入，归档按它计算天数
+    extra = {"completed_at": record["completed_at"]} if completed and record.get("completed_at") else None
+    return Todo(_number(record.get("id")), text, completed, created, _number(record.get("order")),
+                group=(record.get("group") or "").strip() or default_group, extra=extra)
+
+
+class ImportResult:
+    """导入结果与吞吐量"""
+    def __init__(self, count, skipped, seconds):
+        self.count = count
+        self.skipped = skipped
+        self.seconds = seconds
+    
+    @property
+    def rate(self):
+        """每秒导入的任务数"""
+        return self.count / self.seconds if self.seconds > 0 else float(self.count)
+    
+    def __str__(self):
+        return f"导入 {self.count} 条任务，跳过 {self.skipped} 条，用时 {self.seconds:.2f} 秒（{self.rate:.0f} 条/秒）"
+
+
+def import_todos(store, records, default_group=DEFAULT_GROUP, batch_size=1000,
+                 on_group=None, on_batch=None):
+    """流式导入：每攒够batch_size条提交一次
+    on_group(group)在第一次遇到某个分组时调用（懒加载模式下先载入分组），
+    on_batch()在每批提交后调用（例如把变更登记给存储后端）
+    文本为空的记录和id已存在的任务计入跳过条数"""
+    start = time.perf_counter()
+    count = skipped = 0
+    seen_groups = set()
+    batch = []
+    for record in records:
+        todo = record_to_todo(record, default_group)
+        if todo is None:
+            skipped += 1
+            continue
+        if todo.group not in seen_groups:
+            seen_groups.add(todo.group)
+            if on_group:
+                on_group(todo.group)
+        batch.append(todo)
+        if len(batch) >= batch_size:
+            added = len(store.add_many(batch))
+            count += added
+            skipped += len(batch) - added
+            batch = []
+            if on_batch:
+                on_batch()
+    if batch:
+        added = len(store.add_many(batch))
+        count += added
+        skipped += len(batch) - added
+        if on_batch:
+            on_batch()
+    return ImportResult(count, skipped, time.perf_counter() - start)
+
+
+def import_file(store, path, fmt=None, columns=None, **kwargs):
+    """从文件导入任务"""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return import_todos(store, read_records(f, fmt, columns), **kwargs)
+
+
+def export_todos(todos, f, fmt):
+    """流式导出任务，todos按分组、顺序排列；返回导出条数"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(list(CSV_COLUMNS.values()))
+    last_group = None
+    for todo in todos:
+        if fmt == "jsonl":
+            f.write(json.dumps(todo.to_dict(), ensure_ascii=False) + "\n")
+        elif fmt == "csv":
+            writer.writerow([todo.group, todo.text, int(todo.completed), todo.created_at])
+        else:
+            if todo.group != last_group:
+                if last_group is not None:
+                    f.write("\n")
+                f.write(f"## {todo.group}\n\n")
+                last_group = todo.group
+            lines = todo.text.split("\n")
+            f.write(f"- [{'x' if todo.completed else ' '}] {lines[0]}\n")
+            # 续行（包括空行）都缩进两格，导入时据此并回同一条任务
+            for line in lines[1:]:
+                f.write(f"  {line}\n")
+        count += 1
+    return count
+
+
+def export_file(todos, path, fmt=None):
+    """导出任务到文件"""
+    fmt = fmt or detect_format(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        return export_todos(todos, f, fmt)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 全文搜索
+内存中的倒排索引：中日韩文字按相邻两字（bigram）切分，英文、数字和URL按单词切分。
+索引在第一次搜索时建立（含归档），之后通过TodoStore的观察者随添加、编辑、删除增量更新。
+搜索时先按词求id集合的交集得到候选，再逐条确认确实包含每个关键词。
+"""
+import bisect
+import heapq
+import re
+
+# 中日韩文字（汉字、假名、谚文）连续成段，其余按英文单词切分
+_TOKEN_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+|[0-9a-z]+")
+
+
+def tokenize(text):
+    """文本 -> 词集合：中日韩文字取相邻两字（只有一个字的段取单字），英文单词转小写"""
+    tokens = set()
+    for match in _TOKEN_RE.finditer(text.lower()):
+        word = match.group()
+        if word[0].isascii():
+            tokens.add(word)
+        elif len(word) == 1:
+            tokens.add(word)
+        else:
+            tokens.update(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class SearchResult:
+    """一条搜索结果"""
+    __slots__ = ("todo", "archived")
+    
+    def __init__(self, todo, archived):
+        self.todo = todo
+        self.archived = archived
+
+
+class TodoSearchIndex:
+    """任务文本的倒排索引：词 -> 任务id集合"""
+    def __init__(self, archive=None):
+        self.archive = archive
+        self.store = None
+        self.built = False
+        self.postings = {}       # 词 -> {任务id}
+        self.texts = {}          # 任务id -> 建索引时的文本（编辑后用来删除旧词）
+        self.todos = {}          # 任务id -> 热数据中的任务
+        self.archived = {}       # 任务id -> 归档中的任务
+        self.char_tokens = {}    # 中日韩单字 -> 含这个字的词，用于单字搜索
+        self._words = None       # 排好序的英文词，用于前缀匹配，词表变化后重建
+        self.archive_stale = True
+    
+    def attach(self, store):
+        """换成新的TodoStore（启动加载完成时），索引在下次搜索时重建"""
+        if self.store is not None and self._on_change in self.store.observers:
+            self.store.observers.remove(self._on_change)
+        self.store = store
+        store.observers.append(self._on_change)
+        self.built = False
+    
+    def invalidate_archive(self):
+        """归档有变化（新归档、分组改名）后，下次搜索时重新读取"""
+        self.archive_stale = True
+    
+    def ensure_built(self):
+        """第一次搜索时为已载入的全部任务和归档建立索引"""
+        if self.built and not self.archive_stale:
+            return
+        if not self.built:
+            self._reset()
+            for todo in self.store.to_list():
+                self._add(todo, self.todos)
+            self.built = True
+        if self.archive_stale:
+            self._clear(self.archived)
+            if self.archive is not None:
+                try:
+                    for todo in self.archive.iter_all():
+                        self._add(todo, self.archived)
+                except Exception as e:
+                    print(f"读取归档失败: {e}")
+            self.archive_stale = False
+    
+    def _reset(self):
+        self.postings = {}
+        self.texts = {}
+        self.todos = {}
+        self.archived = {}
+        self.char_tokens = {}
+        self._words = None
+        self.archive_stale = True
+    
+    def _on_change(self, event, todos):
+        """TodoStore的观察者：索引建立后才跟随更新"""
+        if not self.built:
+            return
+        if event == "reset":
+            self.built = False
+        elif event == "add":
+            for todo in todos:
+                self._add(todo, self.todos)
+        elif event == "edit":
+            for todo in todos:
+                self._remove(todo.id, self.todos)
+                self._add(todo, self.todos)
+        elif event == "remove":
+            for todo in todos:
+                self._remove(todo.id, self.todos)
+    
+    def _add(self, todo, docs):
+        if todo.id in self.todos:
+            return
+        if todo.id in self.archived:
+            if docs is self.archived:
+                return
+            # 归档后未来得及从热数据删除的任务以热数据为准
+            self._remove(todo.id, self.archived)
+        docs[todo.id] = todo
+        self.texts[todo.id] = todo.text
+        postings = self.postings
+        for token in tokenize(todo.text):
+            ids = postings.get(token)
+            if ids is None:
+                ids = postings[token] = set()
+                self._new_token(token)
+            ids.add(todo.id)
+    
+    def _remove(self, todo_id, docs):
+        if docs.pop(todo_id, None) is None:
+            return
+        text = self.texts.pop(todo_id)
+        postings = self.postings
+        for token in tokenize(text):
+            ids = postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(todo_id)
+            if not ids:
+                del postings[token]
+                self._drop_token(token)
+    
+    def _clear(self, docs):
+        for todo_id in list(docs):
+            self._remove(todo_id, docs)
+    
+    def _new_token(self, token):
+        if token[0].isascii():
+            self._words = None
+        else:
+            for char in set(token):
+                self.char_tokens.setdefault(char, set()).add(token)
+    
+    def _drop_token(self, token):
+        if token[0].isascii():
+            self._words = None
+            return
+        for char in set(token):
+            tokens = self.char_tokens.get(char)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.char_tokens[char]
+    
+    def _candidates(self, token):
+        """一个查询词对应的任务id：英文按前缀匹配，中日韩单字匹配所有含这个字的词"""
+        postings = self.postings
+        if token[0].isascii():
+            if self._words is None:
+                self._words = sorted(word for word in postings if word[0].isascii())
+            words = self._words
+            start = end = bisect.bisect_left(words, token)
+            while end < len(words) and words[end].startswith(token):
+                end += 1
+            return set().union(*(postings[word] for word in words[start:end]))
+        if len(token) == 1:
+            return set().union(*(postings[other] for other in self.char_tokens.get(token, ())))
+        return postings.get(token, set())
+    
+    def matching_ids(self, query):
+        """包含全部关键词（以空格分隔）的任务id，热数据和归档都在内"""
+        terms = query.lower().split()
+        if not terms:
+            return []
+        self.ensure_built()
+        
+        # 按候选集从小到大求交集，越早变小越好
+        sets = []
+        verify = []  # 需要逐条比对原文的关键词：切成多个词（词序可能不符）或含有不建索引的字符
+        for term in terms:
+            tokens = tokenize(term)
+            if tokens != {term}:
+                verify.append(term)
+            if not tokens:
+                # 只有标点等不建索引的字符，只能逐条比对
+                sets.append(set(self.texts))
+                continue
+            for token in tokens:
+                sets.append(self._candidates(token))
+        sets.sort(key=len)
+        ids = set(sets[0])
+        for other in sets[1:]:
+            ids &= other
+            if not ids:
+                break
+        
+        if verify:
+            texts = self.texts
+            return [todo_id for todo_id in ids
+                    if all(term in texts[todo_id].lower() for term in verify)]
+        return list(ids)
+    
+    def search(self, query, limit=50):
+        """搜索包含全部关键词的任务，返回(结果列表, 匹配总数)
+        结果中未完成的在前，其次是已完成的，归档的排在最后，同类按创建时间从新到旧"""
+        ids = self.matching_ids(query)
+        todos = self.todos
+        archived = self.archived
+        
+        def rank(todo_id):
+            todo = todos.get(todo_id)
+            if todo is None:
+                todo = archived[todo_id]
+                return (True, todo.completed, -todo.created)
+            return (False, todo.completed, -todo.created)
+        
+        # 只为要显示的前limit条排序并生成结果
+        top = heapq.nsmallest(limit, ids, key=rank)
+        return [SearchResult(todos.get(todo_id) or archived[todo_id], todo_id not in todos)
+                for todo_id in top], len(ids)
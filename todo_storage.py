@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 持久化
+json:    每次保存整体重写todo_data.json
+journal: todo_data.json作为快照，每次变更只向日志追加一条记录，
+         日志超过大小或时间阈值后在后台线程合并回快照
+sqlite:  todo_data.db，按分组懒加载，当前分组和统计走(group, order)/(group, completed)索引
+sharded: todo_data/目录下每个分组一个文件，manifest.json记录文件名和各分组统计，按分组懒加载
+界面线程只调用record()登记变更，真正的写盘由BackgroundWriter在后台线程调用flush()完成
+"""
+import json
+import os
+import threading
+import time
+
+from todo_store import Todo, TodoStore
+
+_SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS todos (
+        id PRIMARY KEY,
+        grp TEXT NOT NULL,
+        ord REAL NOT NULL,
+        completed INTEGER NOT NULL,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_todos_group_order ON todos (grp, ord);
+    CREATE INDEX IF NOT EXISTS idx_todos_group_completed ON todos (grp, completed);
+"""
+_SQLITE_UPSERT = "INSERT OR REPLACE INTO todos VALUES (?, ?, ?, ?, ?)"
+
+
+def write_json_atomic(path, data):
+    """写入临时文件并fsync后再替换，避免写到一半时崩溃损坏原文件"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class DataLock:
+    """数据文件的进程锁（todo_data.lock）：界面运行期间一直持有，命令行写入前检查
+    用操作系统的文件锁实现，进程退出（包括崩溃）时自动释放，不会残留"""
+    def __init__(self, data_file):
+        self.path = os.path.splitext(data_file)[0] + ".lock"
+        self._file = None
+    
+    def acquire(self, timeout=0):
+        """加锁，timeout秒内一直被其他进程持有时返回False"""
+        deadline = time.monotonic() + timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def _try_lock(self):
+        if self._file is not None:
+            return True
+        f = open(self.path, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+    
+    def release(self):
+        """释放锁（锁文件保留，下次直接复用）"""
+        if self._file is None:
+            return
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def _replay_journal(path, todos):
+    """把日志中的记录依次应用到todos（id -> 任务）上"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 崩溃时写了一半的最后一行，忽略
+                break
+            if record["op"] == "put":
+                todo = record["todo"]
+                todos[todo["id"]] = todo
+            elif record["op"] == "del":
+                todos.pop(record["id"], None)
+
+
+class JsonStorage:
+    """单文件JSON存储，每次保存整体重写"""
+    lazy = False  # 启动时一次载入全部分组
+    
+    def __init__(self, data_file):
+        self.data_file = data_file
+        base = os.path.splitext(data_file)[0]
+        self.journal_file = base + ".journal"
+        # 正在合并的旧日志
+        self.compacting_file = self.journal_file + ".1"
+        self._dirty = False
+    
+    def load(self):
+        """读取全部任务"""
+        todos = {}
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                for todo in json.load(f):
+                    todos[todo["id"]] = todo
+        # 从日志模式切换回来时，先补上日志中尚未合并的变更
+        _replay_journal(self.compacting_file, todos)
+        _replay_journal(self.journal_file, todos)
+        return [Todo.from_dict(todo) for todo in todos.values()]
+    
+    def save(self, store):
+        """同步保存"""
+        self.record(store)
+        self.flush(store)
+    
+    def record(self, store):
+        """登记变更（界面线程调用，不做磁盘IO）"""
+        store.pop_changes()
+        self._dirty = True
+    
+    def flush(self, store):
+        """整体重写数据文件"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        write_json_atomic(self.data_file, store.snapshot())
+        # 日志内容已经包含在新文件中
+        for path in (self.compacting_file, self.journal_file):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def close(self):
+        """退出前收尾"""
+        pass
+
+
+class JournalStorage(JsonStorage):
+    """快照 + 追加日志存储，写入量只与变更大小有关"""
+    def __init__(self, data_file, compact_bytes=256 * 1024, compact_age=600):
+        super().__init__(data_file)
+        self.compact_bytes = compact_bytes  # 日志超过该大小后合并
+        self.compact_age = compact_age      # 日志存在超过该秒数后合并
+        self._journal = None
+        self._journal_started = None
+        self._compactor = None
+        self._pending = []  # 已登记、尚未写入日志的记录
+        self._pending_lock = threading.Lock()
+    
+    def load(self):
+        """读取快照并重放日志"""
+        todos = super().load()
+        if os.path.exists(self.journal_file) and os.path.getsize(self.journal_file):
+            self._truncate_torn_tail()
+            self._journal_started = time.time()
+        return todos
+    
+    def _truncate_torn_tail(self):
+        """截掉崩溃时写了一半的最后一行，避免后续追加的记录与它粘在一起"""
+        with open(self.journal_file, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(end)
+    
+    def record(self, store):
+        """把变更序列化为日志记录，只与变更大小有关"""
+        with store.lock:
+            changes = store.pop_changes()
+            lines = []
+            for todo_id, todo in changes.items():
+                if todo is None:
+                    record = {"op": "del", "id": todo_id}
+                else:
+                    record = {"op": "put", "todo": todo.to_dict()}
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+        with self._pending_lock:
+            self._pending.extend(lines)
+    
+    def flush(self, store):
+        """把登记的记录追加到日志末尾"""
+        with self._pending_lock:
+            lines = self._pending
+            self._pending = []
+        if not lines:
+            return
+        
+        if self._journal is None:
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        if self._journal_started is None:
+            self._journal_started = time.time()
+        
+        if self._should_compact():
+            self.compact()
+    
+    def _should_compact(self):
+        """日志是否超过大小或时间阈值"""
+        if self._journal_started is None:
+            return False
+        if self._compactor is not None and self._compactor.is_alive():
+            return False
+        if time.time() - self._journal_started >= self.compact_age:
+            return True
+        return self._journal.tell() >= self.compact_bytes
+    
+    def compact(self):
+        """轮换日志并在后台线程把旧日志合并进快照"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if os.path.exists(self.compacting_file):
+            # 上次合并未完成（例如中途退出），先同步合并掉
+            self._merge_into_snapshot()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if not os.path.exists(self.journal_file):
+            return
+        os.replace(self.journal_file, self.compacting_file)
+        self._journal_started = None
+        self._compactor = threading.Thread(target=self._merge_into_snapshot)
+        self._compactor.start()
+    
+    def _merge_into_snapshot(self):
+        """快照 + 旧日志 -> 新快照（只读磁盘，不访问内存中的数据）"""
+        try:
+            todos = {}
+            if os.path.exists(self.data_file):
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    for todo in json.load(f):
+                        todos[todo["id"]] = todo
+            _replay_journal(self.compacting_file, todos)
+            write_json_atomic(self.data_file, list(todos.values()))
+            # 快照已落盘后再删除旧日志；若在此之前崩溃，重放旧日志也是幂等的
+            os.remove(self.compacting_file)
+        except Exception as e:
+            print(f"合并日志失败: {e}")
+    
+    def close(self):
+        """关闭日志文件并等待后台合并结束"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._compactor is not None:
+            self._compactor.join()
+
+
+class SqliteStorage:
+    """SQLite存储，每个任务一行，按分组懒加载"""
+    lazy = True
+    
+    def __init__(self, db_file, json_file=None):
+        self.db_file = db_file
+        if not os.path.exists(db_file) and json_file and os.path.exists(json_file):
+            # 首次启用时从todo_data.json一次性迁移
+            migrate_json_to_sqlite(json_file, db_file)
+        # 只有sqlite模式才加载sqlite3，其他模式（包括命令行）省去这部分导入
+        import sqlite3
+        # 后台写线程和界面线程共用连接，由_db_lock串行化
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.executescript(_SQLITE_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+    
+    def load(self):
+        """读取全部任务"""
+        with self._db_lock:
+            rows = self._conn.execute("SELECT data FROM todos ORDER BY grp, ord").fetchall()
+        return [Todo.from_dict(json.loads(data)) for (data,) in rows]
+    
+    def load_group(self, group):
+        """读取一个分组的任务（按order排序）"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT data FROM todos WHERE grp = ? ORDER BY ord", (group,)).fetchall()
+        return [Todo.from_dict(json.loads(data)) for (data,) in rows]
+    
+    def group_counts(self):
+        """各分组的(总数, 已完成数)"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT grp, COUNT(*), SUM(completed) FROM todos GROUP BY grp").fetchall()
+        return {group: (total, completed or 0) for group, total, completed in rows}
+    
+    def save(self, store):
+        """同步保存"""
+        self.record(store)
+        self.flush(store)
+    
+    def record(self, store):
+        """把变更转换为待写入的行"""
+        with store.lock:
+            changes = store.pop_changes()
+            ops = []
+            for todo_id, todo in changes.items():
+                if todo is None:
+                    ops.append((todo_id, None))
+                else:
+                    ops.append((todo_id, _sqlite_row(todo)))
+        with self._pending_lock:
+            self._pending.extend(ops)
+    
+    def flush(self, store):
+        """在一个事务中写入登记的变更"""
+        with self._pending_lock:
+            ops = self._pending
+            self._pending = []
+        if not ops:
+            return
+        with self._db_lock, self._conn:
+            for todo_id, row in ops:
+                if row is None:
+                    self._conn.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
+                else:
+                    self._conn.execute(_SQLITE_UPSERT, row)
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._db_lock:
+            self._conn.close()
+
+
+class ShardedStorage:
+    """按分组分片的JSON存储，启动时只需读清单和当前分组的文件"""
+    lazy = True
+    
+    def __init__(self, data_dir, json_file=None):
+        self.data_dir = data_dir
+        self.manifest_file = os.path.join(data_dir, "manifest.json")
+        if not os.path.exists(self.manifest_file) and json_file and os.path.exists(json_file):
+            # 首次启用时把todo_data.json按分组拆开
+            migrate_json_to_shards(json_file, data_dir)
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"version": 1, "next_file": 1, "groups": {}}
+        self._dirty_groups = set()
+        self._pending_lock = threading.Lock()
+    
+    def _group_file(self, group):
+        entry = self.manifest["groups"].get(group)
+        if entry is None:
+            return None
+        return os.path.join(self.data_dir, entry["file"])
+    
+    def load(self):
+        """读取全部分组的任务"""
+        todos = []
+        for group in list(self.manifest["groups"]):
+            todos.extend(self.load_group(group))
+        return todos
+    
+    def load_group(self, group):
+        """读取一个分组的任务"""
+        path = self._group_file(group)
+        if path is None or not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return [Todo.from_dict(todo) for todo in json.load(f)]
+    
+    def group_counts(self):
+        """各分组的(总数, 已完成数)，直接取自清单"""
+        return {group: (entry["total"], entry["completed"])
+                for group, entry in self.manifest["groups"].items()}
+    
+    def save(self, store):
+        """同步保存"""
+        self.record(store)
+        self.flush(store)
+    
+    def record(self, store):
+        """登记有变更的分组"""
+        with store.lock:
+            groups = store.pop_dirty_groups()
+            store.pop_changes()
+        with self._pending_lock:
+            self._dirty_groups.update(groups)
+    
+    def flush(self, store):
+        """重写有变更的分组文件，最后更新清单"""
+        with self._pending_lock:
+            groups = self._dirty_groups
+            self._dirty_groups = set()
+        if not groups:
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        entries = self.manifest["groups"]
+        for group in groups:
+            todos, (total, completed) = store.snapshot_group(group)
+            path = self._group_file(group)
+            if not todos:
+                # 分组已清空、重命名或删除
+                entries.pop(group, None)
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+                continue
+            if path is None:
+                entries[group] = {"file": f"group_{self.manifest['next_file']}.json"}
+                self.manifest["next_file"] += 1
+                path = self._group_file(group)
+            write_json_atomic(path, todos)
+            entries[group]["total"] = total
+            entries[group]["completed"] = completed
+        write_json_atomic(self.manifest_file, self.manifest)
+    
+    def close(self):
+        """退出前收尾"""
+        pass
+
+
+def migrate_json_to_shards(json_file, data_dir):
+    """把todo_data.json（含未合并的日志）一次性拆分为按分组的文件"""
+    store = TodoStore(JsonStorage(json_file).load())
+    groups = dict.fromkeys(todo.group for todo in store.to_list())
+    manifest = {"version": 1, "next_file": 1, "groups": {}}
+    os.makedirs(data_dir, exist_ok=True)
+    for group in groups:
+        file_name = f"group_{manifest['next_file']}.json"
+        manifest["next_file"] += 1
+        total, completed = store.counts(group)
+        write_json_atomic(os.path.join(data_dir, file_name),
+                          [todo.to_dict() for todo in store.group_todos(group)])
+        manifest["groups"][group] = {"file": file_name, "total": total, "completed": completed}
+    # 清单最后写入，迁移中途失败时下次启动会重新迁移
+    write_json_atomic(os.path.join(data_dir, "manifest.json"), manifest)
+
+
+def _sqlite_row(todo):
+    """任务 -> todos表的一行"""
+    return (todo.id, todo.group, todo.order, int(todo.completed),
+            json.dumps(todo.to_dict(), ensure_ascii=False))
+
+
+def migrate_json_to_sqlite(json_file, db_file):
+    """把todo_data.json（含未合并的日志）一次性迁移到新的SQLite数据库"""
+    if os.path.exists(db_file):
+        raise FileExistsError(db_file)
+    # order和group由TodoStore补齐
+    rows = [_sqlite_row(todo) for todo in TodoStore(JsonStorage(json_file).load()).to_list()]
+    # 先写临时库再改名，迁移中途失败不会留下半个数据库
+    tmp_file = db_file + ".tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    import sqlite3
+    conn = sqlite3.connect(tmp_file)
+    try:
+        with conn:
+            conn.executescript(_SQLITE_SCHEMA)
+            conn.executemany(_SQLITE_UPSERT, rows)
+    finally:
+        conn.close()
+    os.replace(tmp_file, db_file)
+
+
+def open_storage(data_file, mode="json"):
+    """根据配置的存储模式创建存储后端"""
+    if mode == "journal":
+        return JournalStorage(data_file)
+    if mode == "sqlite":
+        return SqliteStorage(os.path.splitext(data_file)[0] + ".db", data_file)
+    if mode == "sharded":
+        return ShardedStorage(os.path.splitext(data_file)[0], data_file)
+    return JsonStorage(data_file)
+
+
+class BackgroundWriter:
+    """后台持久化线程：界面线程只打脏标记，合并窗口内的多次写入只落盘一次"""
+    def __init__(self, delay=0.3):
+        self.delay = delay     # 合并窗口（秒）
+        self._tasks = {}       # 名称 -> 写入函数
+        self._dirty = set()
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def register(self, key, func):
+        """注册写入函数，func在后台线程中执行"""
+        self._tasks[key] = func
+    
+    def mark_dirty(self, key):
+        """标记需要写入（界面线程调用，立即返回）"""
+        with self._cond:
+            self._dirty.add(key)
+            self._cond.notify()
+    
+    def try_lock(self):
+        """界面线程不等待地取得写盘锁，持有期间后台不会开始写盘，用完调用unlock()
+        正在写盘时返回False"""
+        return self._io_lock.acquire(blocking=False)
+    
+    def unlock(self):
+        self._io_lock.release()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                # 等待合并窗口结束，期间的写入请求合并到同一次
+                deadline = time.monotonic() + self.delay
+                while not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    # 剩余内容由stop()同步写出
+                    return
+            self._write_pending()
+    
+    def _write_pending(self):
+        """写出所有脏数据"""
+        with self._io_lock:
+            with self._cond:
+                keys = self._dirty
+                self._dirty = set()
+            for key in keys:
+                try:
+                    self._tasks[key]()
+                except Exception as e:
+                    print(f"保存失败({key}): {e}")
+    
+    def stop(self):
+        """停止后台线程并写出剩余内容（退出时调用）"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+        self._write_pending()
@@ -0,0 +1,530 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 数据模型
+不依赖Tkinter的任务存储，维护id哈希索引、分组有序索引和分组计数，
+界面层只通过这里读写任务
+"""
+import functools
+import sys
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_GROUP = "默认分组"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 相邻任务order的初始间隔；移动任务时取两邻居的中间值，只改动被移动的一条
+ORDER_STEP = 1.0
+
+# 序列化时保持旧版todo_data.json的字段顺序
+_FIELDS = ("id", "text", "completed", "created_at", "order", "group")
+
+
+def parse_time(text):
+    """'YYYY-mm-dd HH:MM:SS' -> 本地时间的整数时间戳（比strptime快得多）"""
+    try:
+        return int(datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                            int(text[11:13]), int(text[14:16]), int(text[17:19])).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def legacy_id(todo_id):
+    """旧版的浮点时间戳id -> 整数id（毫秒时间戳左移10位 + 微秒部分），结果确定且互不冲突"""
+    if isinstance(todo_id, float):
+        return (int(todo_id * 1000) << IdAllocator.SEQ_BITS) + round(todo_id * 1000000) % 1000
+    return todo_id
+
+
+class IdAllocator:
+    """单调递增、按创建时间有序的整数id：毫秒时间戳左移10位 + 序号"""
+    SEQ_BITS = 10
+    
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, todo_id):
+        """记录已存在的id，保证之后分配的id更大"""
+        if isinstance(todo_id, int) and todo_id > self._last:
+            self._last = todo_id
+    
+    def reserve(self, count):
+        """预留count个连续id（批量导入用），返回第一个"""
+        with self._lock:
+            start = max(self._last + 1, int(time.time() * 1000) << self.SEQ_BITS)
+            self._last = start + count - 1
+            return start
+
+
+def _order_between(before, after):
+    """计算排在before和after之间的order，没有空间时返回None"""
+    if before is None and after is None:
+        return 0
+    if before is None:
+        return after - ORDER_STEP
+    if after is None:
+        return before + ORDER_STEP
+    order = (before + after) / 2
+    if before < order < after:
+        return order
+    return None
+
+
+class Todo:
+    """单个任务。用__slots__代替dict，创建时间存整数时间戳，分组名驻留共享"""
+    __slots__ = ("id", "text", "completed", "created", "order", "group", "extra")
+    
+    def __init__(self, id, text, completed=False, created=0, order=None,
+                 group=DEFAULT_GROUP, extra=None):
+        self.id = id
+        self.text = text
+        self.completed = completed
+        self.created = created  # 时间戳（秒）
+        self.order = order
+        self.group = sys.intern(group)
+        self.extra = extra      # 不认识的字段，原样写回
+    
+    @property
+    def created_at(self):
+        """显示用的创建时间"""
+        if self.extra and "created_at" in self.extra:
+            # 无法解析的旧时间字符串原样保留
+            return self.extra["created_at"]
+        return time.strftime(TIME_FORMAT, time.localtime(self.created))
+    
+    @property
+    def completed_time(self):
+        """完成时的时间戳，旧数据没有记录时为None"""
+        if self.extra:
+            return parse_time(self.extra.get("completed_at"))
+        return None
+    
+    def set_completed_time(self, timestamp):
+        """记录完成时间（None表示清除）。存在extra中，各存储后端和归档原样读写"""
+        extra = dict(self.extra or {})
+        if timestamp is None:
+            extra.pop("completed_at", None)
+        else:
+            extra["completed_at"] = time.strftime(TIME_FORMAT, time.localtime(timestamp))
+        self.extra = extra or None
+    
+    @classmethod
+    def from_dict(cls, data):
+        """从JSON记录创建（旧数据缺少group/order时由TodoStore补齐）"""
+        extra = {k: v for k, v in data.items() if k not in _FIELDS}
+        created = parse_time(data.get("created_at"))
+        if created is None:
+            created = 0
+            if "created_at" in data:
+                extra["created_at"] = data["created_at"]
+        return cls(data["id"], data["text"], data.get("completed", False), created,
+                   data.get("order"), data.get("group") or DEFAULT_GROUP, extra or None)
+    
+    def to_dict(self):
+        """转换为与旧版格式相同的JSON记录"""
+        data = {
+            "id": self.id,
+            "text": self.text,
+            "completed": self.completed,
+            "created_at": self.created_at,
+            "order": self.order,
+            "group": self.group
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+def _locked(method):
+    """在store.lock保护下执行，后台写线程据此读取一致的快照"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class TodoStore:
+    """待办事项数据模型"""
+    def __init__(self, todos=None):
+        self._by_id = {}       # id -> 任务（保持文件中的顺序）
+        self._group_ids = {}   # 分组 -> 按order排序的任务id列表
+        self._positions = {}   # 分组 -> {id: 位置}，按需重建
+        self._counts = {}      # 分组 -> [总数, 已完成数]
+        self._changes = {}     # 未保存的变更：id -> 任务，删除时为None
+        self._dirty_groups = set()  # 有未保存变更的分组
+        self._loaded = None    # 已载入的分组，None表示全部载入
+        self.ids = IdAllocator()
+        self.lock = threading.RLock()
+        # 观察者observer(事件, 任务列表)，用于维护搜索、标签等派生索引：
+        # reset/add/edit/remove，以及toggle（完成状态改变）和regroup（任务移到了其他分组）
+        self.observers = []
+        if todos:
+            self.load(todos)
+    
+    @_locked
+    def load(self, todos):
+        """载入任务列表并建立索引"""
+        self._by_id = {}
+        self._group_ids = {}
+        self._positions = {}
+        self._counts = {}
+        self._changes = {}
+        self._dirty_groups = set()
+        self._loaded = None
+        self._notify("reset", [])
+        self._index(todos)
+    
+    @_locked
+    def set_lazy(self, counts):
+        """切换为按分组懒加载：先只记录各分组的(总数, 已完成数)"""
+        self._loaded = set()
+        for group, (total, completed) in counts.items():
+            self._counts[group] = [total, completed]
+    
+    def is_loaded(self, group):
+        """分组的任务是否已载入"""
+        return self._loaded is None or group in self._loaded
+    
+    @_locked
+    def load_group(self, group, todos):
+        """载入一个分组的任务（懒加载模式）"""
+        if self.is_loaded(group):
+            return
+        self._loaded.add(group)
+        self._counts[group] = [0, 0]
+        self._group_ids[group] = []
+        self._index(todos)
+    
+    def _index(self, todos):
+        """为新载入的任务建立索引"""
+        new_groups = {}
+        for todo in todos:
+            if isinstance(todo.id, float):
+                # 旧版浮点id换成整数id，按删除旧记录 + 写入新记录保存
+                self._changes[todo.id] = None
+                todo.id = legacy_id(todo.id)
+                self._mark(todo)
+            self.ids.observe(todo.id)
+            self._by_id[todo.id] = todo
+            new_groups.setdefault(todo.group, []).append(todo.id)
+        
+        for group, ids in new_groups.items():
+            # 为每个分组的任务分配连续的order值
+            for i, todo_id in enumerate(ids):
+                todo = self._by_id[todo_id]
+                if todo.order is None:
+                    todo.order = i
+            ids.sort(key=lambda todo_id: self._by_id[todo_id].order)
+            completed = sum(1 for todo_id in ids if self._by_id[todo_id].completed)
+            self._group_ids[group] = ids
+            self._counts[group] = [len(ids), completed]
+            self._positions.pop(group, None)
+        if self.observers:
+            self._notify("add", [self._by_id[todo_id] for ids in new_groups.values() for todo_id in ids])
+    
+    def __len__(self):
+        return len(self._by_id)
+    
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+    
+    def __contains__(self, todo_id):
+        return todo_id in self._by_id
+    
+    def get(self, todo_id):
+        """按id获取任务，不存在时返回None"""
+        return self._by_id.get(todo_id)
+    
+    def to_list(self):
+        """导出全部任务（用于保存）"""
+        return list(self._by_id.values())
+    
+    @_locked
+    def pop_changes(self):
+        """取出自上次保存以来的变更（id -> 任务，删除为None）"""
+        changes = self._changes
+        self._changes = {}
+        return changes
+    
+    def has_changes(self):
+        """是否有未保存的变更"""
+        return bool(self._changes)
+    
+    @_locked
+    def pop_dirty_groups(self):
+        """取出自上次调用以来有变更的分组（按分组保存的后端使用）"""
+        groups = self._dirty_groups
+        self._dirty_groups = set()
+        return groups
+    
+    @_locked
+    def snapshot(self):
+        """复制全部任务，供后台线程序列化"""
+        return [todo.to_dict() for todo in self._by_id.values()]
+    
+    @_locked
+    def snapshot_group(self, group):
+        """复制一个分组的任务及其统计，供后台线程序列化"""
+        todos = [self._by_id[todo_id].to_dict() for todo_id in self._group_ids.get(group, ())]
+        return todos, self.counts(group)
+    
+    def group_todos(self, group):
+        """获取分组内按order排序的任务"""
+        return [self._by_id[todo_id] for todo_id in self._group_ids.get(group, ())]
+    
+    def visible_todos(self, group, show_completed=True):
+        """获取分组内需要显示的任务"""
+        todos = self.group_todos(group)
+        if show_completed:
+            return todos
+        return [t for t in todos if not t.completed]
+    
+    def group_names(self):
+        """已知的分组名（含懒加载模式下尚未载入的分组）"""
+        return list(self._counts)
+    
+    def iter_ordered(self):
+        """按分组、组内顺序依次遍历已载入的任务"""
+        for group in list(self._group_ids):
+            yield from self.group_todos(group)
+    
+    def group_size(self, group):
+        """分组内的任务数"""
+        return len(self._group_ids.get(group, ()))
+    
+    def counts(self, group):
+        """分组统计，返回(总数, 已完成数)"""
+        total, completed = self._counts.get(group, (0, 0))
+        return total, completed
+    
+    def index_of(self, todo_id):
+        """获取任务在其分组中的位置，不存在时返回-1"""
+        todo = self._by_id.get(todo_id)
+        if todo is None:
+            return -1
+        group = todo.group
+        positions = self._positions.get(group)
+        if positions is None:
+            positions = {tid: i for i, tid in enumerate(self._group_ids[group])}
+            self._positions[group] = positions
+        return positions[todo_id]
+    
+    @_locked
+    def add(self, text, group):
+        """添加任务到分组末尾"""
+        todo = Todo(None, text, created=int(time.time()), group=group)
+        return self.add_many([todo])[0]
+    
+    @_locked
+    def add_many(self, todos):
+        """批量添加任务：没有id的一次性预留一段连续id，没有order的依次排到分组末尾
+        返回实际添加的任务（id已存在的跳过）"""
+        missing = sum(1 for todo in todos if todo.id is None)
+        next_id = self.ids.reserve(missing) if missing else None
+        added = []
+        for todo in todos:
+            if todo.id is None:
+                todo.id = next_id
+                next_id += 1
+            else:
+                todo.id = legacy_id(todo.id)
+                if todo.id in self._by_id:
+                    # 重复导入同一任务时保留已有的那条
+                    continue
+                self.ids.observe(todo.id)
+            ids = self._group_ids.setdefault(todo.group, [])
+            if todo.order is None or (ids and todo.order <= self._by_id[ids[-1]].order):
+                todo.order = self._by_id[ids[-1]].order + ORDER_STEP if ids else 0
+            self._by_id[todo.id] = todo
+            ids.append(todo.id)
+            counts = self._counts.setdefault(todo.group, [0, 0])
+            counts[0] += 1
+            if todo.completed:
+                counts[1] += 1
+            self._positions.pop(todo.group, None)
+            self._mark(todo)
+            added.append(todo)
+        self._notify("add", added)
+        return added
+    
+    @_locked
+    def toggle(self, todo_id):
+        """切换任务完成状态，完成时记下完成时间"""
+        todo = self._by_id.get(todo_id)
+        if todo is None:
+            return None
+        todo.completed = not todo.completed
+        todo.set_completed_time(int(time.time()) if todo.completed else None)
+        self._counts[todo.group][1] += 1 if todo.completed else -1
+        self._mark(todo)
+        self._notify("toggle", [todo])
+        return todo
+    
+    @_locked
+    def stamp_completed(self, todo_id, timestamp):
+        """为没有完成时间的已完成任务（旧数据、导入的任务）补记完成时间"""
+        todo = self._by_id.get(todo_id)
+        if todo is not None:
+            todo.set_completed_time(timestamp)
+            self._mark(todo)
+        return todo
+    
+    @_locked
+    def set_text(self, todo_id, text):
+        """修改任务内容"""
+        todo = self._by_id.get(todo_id)
+        if todo is not None:
+            todo.text = text
+            self._mark(todo)
+            self._notify("edit", [todo])
+        return todo
+    
+    @_locked
+    def remove(self, todo_id):
+        """删除任务（其余任务的order不变）"""
+        todo = self._by_id.pop(todo_id, None)
+        if todo is None:
+            return None
+        group = todo.group
+        ids = self._group_ids[group]
+        ids.remove(todo_id)
+        counts = self._counts[group]
+        counts[0] -= 1
+        if todo.completed:
+            counts[1] -= 1
+        self._positions.pop(group, None)
+        self._changes[todo_id] = None
+        self._dirty_groups.add(group)
+        self._notify("remove", [todo])
+        return todo
+    
+    def move(self, todo_id, to_index):
+        """将任务移动到分组内的指定位置"""
+        from_index = self.index_of(todo_id)
+        if from_index < 0:
+            return False
+        return self.move_to_position(self._by_id[todo_id].group, from_index, to_index)
+    
+    @_locked
+    def move_to_position(self, group, from_index, to_index):
+        """将分组内from_index位置的任务移动到to_index"""
+        ids = self._group_ids.get(group, [])
+        if from_index < 0 or to_index < 0 or from_index >= len(ids) or to_index >= len(ids):
+            return False
+        if from_index == to_index:
+            return False
+        todo_id = ids.pop(from_index)
+        ids.insert(to_index, todo_id)
+        before = self._by_id[ids[to_index - 1]].order if to_index > 0 else None
+        after = self._by_id[ids[to_index + 1]].order if to_index + 1 < len(ids) else None
+        order = _order_between(before, after)
+        if order is None:
+            # 两邻居之间已无可用的浮点数，重新铺开附近的一小段（极少发生）
+            self._rebalance(ids, to_index)
+        else:
+            todo = self._by_id[todo_id]
+            todo.order = order
+            self._mark(todo)
+        self._positions.pop(group, None)
+        return True
+    
+    def move_up(self, todo_id):
+        """向上移动任务（仅在分组内）"""
+        index = self.index_of(todo_id)
+        if index <= 0:
+            return False
+        return self.move(todo_id, index - 1)
+    
+    def move_down(self, todo_id):
+        """向下移动任务（仅在分组内）"""
+        index = self.index_of(todo_id)
+        if index < 0:
+            return False
+        return self.move(todo_id, index + 1)
+    
+    @_locked
+    def rename_group(self, old_name, new_name):
+        """重命名分组，同步更新任务的group字段"""
+        if old_name == new_name:
+            return
+        self.merge_group(old_name, new_name)
+        if self._loaded is not None and old_name in self._loaded:
+            # 新名称下的任务就是原分组已载入的任务
+            self._loaded.discard(old_name)
+            self._loaded.add(new_name)
+    
+    @_locked
+    def merge_group(self, source, target):
+        """把source分组的任务依次移到target分组末尾
+        懒加载模式下两个分组都须已载入（全新的target除外），否则保存时会覆盖未载入的任务"""
+        for group in (source, target):
+            if group in self._counts and not self.is_loaded(group):
+                raise ValueError(f"分组尚未载入: {group}")
+        ids = self._group_ids.pop(source, [])
+        source_counts = self._counts.pop(source, [0, 0])
+        self._positions.pop(source, None)
+        self._dirty_groups.add(source)
+        if not ids:
+            return
+        target = sys.intern(target)
+        target_ids = self._group_ids.setdefault(target, [])
+        # 目标分组为空（重命名）时保留原order，否则依次排到末尾
+        last = self._by_id[target_ids[-1]].order if target_ids else None
+        for todo_id in ids:
+            todo = self._by_id[todo_id]
+            todo.group = target
+            if last is not None:
+                last += ORDER_STEP
+                todo.order = last
+            self._mark(todo)
+        target_ids.extend(ids)
+        if self.observers:
+            self._notify("regroup", [self._by_id[todo_id] for todo_id in ids])
+        target_counts = self._counts.setdefault(target, [0, 0])
+        target_counts[0] += source_counts[0]
+        target_counts[1] += source_counts[1]
+        self._positions.pop(target, None)
+    
+    def _renumber(self, ids):
+        """按列表顺序重新分配间隔均匀的order值，只记录真正变化的任务"""
+        for i, todo_id in enumerate(ids):
+            todo = self._by_id[todo_id]
+            if todo.order != i * ORDER_STEP:
+                todo.order = i * ORDER_STEP
+                self._mark(todo)
+    
+    def _rebalance(self, ids, index):
+        """从index附近的小窗口开始逐步扩大，把窗口内的order均匀铺开"""
+        width = 8
+        while True:
+            lo = max(0, index - width)
+            hi = min(len(ids) - 1, index + width)
+            before = self._by_id[ids[lo - 1]].order if lo > 0 else None
+            after = self._by_id[ids[hi + 1]].order if hi + 1 < len(ids) else None
+            count = hi - lo + 1
+            if before is None and after is None:
+                self._renumber(ids)
+                return
+            if before is None:
+                before = after - (count + 1) * ORDER_STEP
+            if after is None:
+                after = before + (count + 1) * ORDER_STEP
+            gap = (after - before) / (count + 1)
+            if gap > max(abs(before), abs(after)) * 1e-9:
+                for i in range(count):
+                    todo = self._by_id[ids[lo + i]]
+                    todo.order = before + gap * (i + 1)
+                    self._mark(todo)
+                return
+            width *= 2
+    
+    def _notify(self, event, todos):
+        for observer in self.observers:
+            observer(event, todos)
+    
+    def _mark(self, todo):
+        """记录任务有未保存的变更"""
+        self._changes[todo.id] = todo
+        self._dirty_groups.add(todo.group)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 任务文本
+列表中显示的截断文本、文本中超链接的位置和#标签。URL的提取结果按文本缓存，
+任务文本不变时刷新列表不会重新扫描，编辑后文本不同，自然重新计算。
+"""
+import re
+from functools import lru_cache
+
+DISPLAY_LIMIT = 100  # 列表中最多显示的字符数，超出部分以"..."代替
+URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+# 标签：行首或空白之后的#词（URL中的#锚点不算）
+TAG_RE = re.compile(r'(?:^|(?<=\s))#([^\s#,，。.;；:：!！?？、()（）]+)')
+
+
+def display_text(text):
+    """列表中显示的文本（超过DISPLAY_LIMIT个字符时截断）"""
+    if len(text) > DISPLAY_LIMIT:
+        return text[:DISPLAY_LIMIT] + "..."
+    return text
+
+
+def display_text_of(todo):
+    return display_text(todo.text)
+
+
+@lru_cache(maxsize=4096)
+def link_spans(text):
+    """超链接在显示文本中的范围：((起点, 终点, 完整URL), ...)
+    被截断的URL只标记显示出来的部分，点击时仍打开完整URL"""
+    limit = DISPLAY_LIMIT if len(text) > DISPLAY_LIMIT else len(text)
+    spans = []
+    for match in URL_RE.finditer(text):
+        if match.start() >= limit:
+            break
+        spans.append((match.start(), min(match.end(), limit), match.group()))
+    return tuple(spans)
+
+
+@lru_cache(maxsize=4096)
+def parse_tags(text):
+    """文本中的#标签（小写、去重，保持出现顺序）"""
+    return tuple(dict.fromkeys(tag.lower() for tag in TAG_RE.findall(text)))
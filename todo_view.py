@@ -0,0 +1,917 @@
+# -*- coding: utf-8 -*-
+"""
+桌面待办事项 - 虚拟化任务列表
+只为Canvas可见区域（上下各留几行缓冲）内的任务创建行，滚出视口的行放回对象池，
+下次换上别的任务继续使用；各行高度测量后缓存，滚动区域按累计高度计算。
+刷新时按任务id与已显示的行对比，只移动位置变化的行、重绘内容变化的行。
+没显示过的行按字体测量折行后的行数算出高度，不必先创建控件；折行结果按
+(文本, 宽度, 字体)缓存，只在宽度或字体变化时清空。
+行有两种画法（配置项row_renderer）：widgets为每行一组Frame/Text/Button控件，
+canvas直接用Canvas图形项绘制，不创建控件，点击时按坐标判断落在哪个区域；
+控件画法的行内控件共用一个绑定标签，事件同样由列表统一分派，每行不注册回调。
+"""
+import bisect
+import itertools
+from collections import OrderedDict
+import tkinter as tk
+import tkinter.font as tkfont
+import webbrowser
+
+from todo_text import display_text_of, link_spans
+
+ROW_PADX = 5  # 行与Canvas左右边缘的距离
+ROW_PADY = 3  # 行上下的间距
+TEXT_LEFT = 55  # 任务文本距行左边缘的距离（拖拽手柄和复选框的宽度）
+MAX_LINES = 3   # 任务行最多显示的文本行数
+ROW_TAG = "TodoRowEvents"  # 控件画法中行内控件共用的绑定标签，事件由TodoListView统一分派
+
+# 列表行用到的字体：名称 -> (相对任务文字的字号差, 其他属性)
+FONT_SPECS = {
+    "text": (0, {}),
+    "text_done": (0, dict(overstrike=1)),
+    "link": (0, dict(underline=1)),
+    "link_done": (0, dict(underline=1, overstrike=1)),
+    "time": (-3, {}),
+    "glyph": (1, {}),
+    "button": (-2, dict(weight="bold")),
+}
+
+
+class FontRegistry:
+    """列表共用的命名字体：所有行引用同一组Font对象，缩放时只改一次字号，Tk自动重排引用它们的控件"""
+    MIN_SIZE = 8
+    MAX_SIZE = 20
+    
+    def __init__(self, root, size=11, family="微软雅黑"):
+        self.size = min(max(size, self.MIN_SIZE), self.MAX_SIZE)
+        self.fonts = {name: tkfont.Font(root=root, family=family, size=self._size_of(name), **options)
+                      for name, (delta, options) in FONT_SPECS.items()}
+        self.listeners = []  # 字号改变后调用，用于重新计算布局
+    
+    def __getitem__(self, name):
+        return self.fonts[name]
+    
+    def _size_of(self, name):
+        return max(self.size + FONT_SPECS[name][0], 6)
+    
+    def set_size(self, size):
+        """修改任务文字的字号（其余字体按比例跟随），返回是否有变化"""
+        size = min(max(size, self.MIN_SIZE), self.MAX_SIZE)
+        if size == self.size:
+            return False
+        self.size = size
+        for name, font in self.fonts.items():
+            font.configure(size=self._size_of(name))
+        for listener in self.listeners:
+            listener()
+        return True
+
+
+def count_widgets(widget):
+    """控件及其全部子控件的数量"""
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+class Row:
+    """放在Canvas窗口项中的一行，由TodoListView定位和回收"""
+    kind = None
+    signature = None  # 上次set_data时的显示内容
+    y = None
+    width = None
+    
+    def place(self, y, width):
+        """移到y处；位置和宽度都没变时不做任何操作，返回是否移动过"""
+        if y == self.y and width == self.width:
+            return False
+        self.y = y
+        self.width = width
+        self.view.canvas.coords(self.item, ROW_PADX, y + ROW_PADY)
+        self.view.canvas.itemconfigure(self.item, width=width - 2 * ROW_PADX, state="normal")
+        return True
+    
+    def hide(self):
+        self.y = self.width = None
+        self.view.canvas.itemconfigure(self.item, state="hidden")
+    
+    def widget_count(self):
+        return count_widgets(self.frame)
+    
+    def measure(self):
+        return self.frame.winfo_reqheight()
+    
+    def on_configure(self, event):
+        self.view.row_resized(self, event.height)
+
+
+def todo_signature(store, todo):
+    """决定任务行外观的全部内容，相同时不必重绘"""
+    index = store.index_of(todo.id)
+    return (todo.text, todo.completed, todo.created, index > 0,
+            index < store.group_size(todo.group) - 1)
+
+
+class LineMeasurer:
+    """用Font.measure按像素宽度折行，结果按(文本, 宽度, 字体)缓存，超出容量时淘汰最久没用的"""
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def fit(self, count):
+        """容量至少放得下count条，否则整表重算偏移时会把自己的结果挤出缓存"""
+        self.maxsize = max(self.maxsize, count)
+    
+    def clear(self):
+        """宽度或字体大小变化后，原来的折行全部作废"""
+        self.cache.clear()
+    
+    def lines(self, text, width, font):
+        """text折行后每行的(起点, 终点)"""
+        key = (text, width, str(font))
+        lines = self.cache.get(key)
+        if lines is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return lines
+        self.misses += 1
+        lines = self._wrap(text, width, font)
+        self.cache[key] = lines
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+        return lines
+    
+    @staticmethod
+    def _wrap(text, width, font):
+        lines = []
+        base = 0
+        for paragraph in text.split("\n"):
+            start = 0
+            # 大多数任务一行就放得下，只量一次
+            if font.measure(paragraph) <= width:
+                lines.append((base, base + len(paragraph)))
+                base += len(paragraph) + 1
+                continue
+            while start < len(paragraph):
+                # 二分查找放得下的最长前缀，至少放一个字符
+                low, high = start + 1, len(paragraph)
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if font.measure(paragraph[start:middle]) <= width:
+                        low = middle
+                    else:
+                        high = middle - 1
+                end = low
+                if end < len(paragraph) and paragraph[end].isascii() and paragraph[end].isalnum():
+                    # 不从英文单词中间断开
+                    space = paragraph.rfind(" ", start, end)
+                    if space > start:
+                        end = space + 1
+                lines.append((base + start, base + end))
+                start = end
+            base += len(paragraph) + 1
+        return tuple(lines)
+
+
+class TodoRow(Row):
+    """任务行：控件只在创建时生成一次，之后通过set_data换成其他任务；
+    控件本身不绑定回调，只登记给列表，由列表按控件找到行和动作"""
+    kind = "todo"
+    
+    def __init__(self, view):
+        self.view = view
+        self.key = None
+        self.todo = None
+        
+        self.frame = tk.Frame(view.canvas, relief=tk.SOLID, bd=1)
+        
+        self.left_frame = tk.Frame(self.frame)
+        self.left_frame.pack(side=tk.LEFT, padx=5)
+        
+        fonts = view.fonts
+        self.drag_label = tk.Label(self.left_frame, text="☰",
+                                   font=fonts["glyph"],
+                                   fg="#999",
+                                   cursor="hand2")
+        self.drag_label.pack(side=tk.LEFT, padx=(0, 5))
+        view.register(self.drag_label, self, "handle")
+        
+        self.check_var = tk.BooleanVar()
+        self.check_btn = tk.Checkbutton(self.left_frame,
+                                        variable=self.check_var,
+                                        cursor="hand2")
+        self.check_btn.pack(side=tk.LEFT)
+        view.register(self.check_btn, self, "check")
+        
+        self.text_frame = tk.Frame(self.frame)
+        self.text_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # 使用Text组件支持超链接
+        self.task_text = tk.Text(self.text_frame,
+                                 font=fonts["text"],
+                                 wrap=tk.WORD,
+                                 width=30,
+                                 relief=tk.FLAT,
+                                 cursor="hand2")
+        self.task_text.pack(anchor="w", fill=tk.X, expand=True)
+        # 每个超链接一个标签link0、link1……，点击时按序号取当前任务的URL
+        self.link_urls = []
+        self.link_tags = 0
+        view.register(self.task_text, self, "text")
+        
+        self.time_label = tk.Label(self.text_frame,
+                                   font=fonts["time"],
+                                   fg="#aaa",
+                                   anchor="w",
+                                   cursor="hand2")
+        self.time_label.pack(anchor="w")
+        view.register(self.time_label, self, "text")
+        
+        self.right_frame = tk.Frame(self.frame)
+        self.right_frame.pack(side=tk.RIGHT, padx=2)
+        
+        button_style = dict(font=fonts["button"], relief=tk.FLAT,
+                            cursor="hand2", padx=3, pady=0)
+        self.up_btn = tk.Button(self.right_frame, text="↑", fg="#2196F3", **button_style)
+        self.down_btn = tk.Button(self.right_frame, text="↓", fg="#2196F3", **button_style)
+        self.delete_btn = tk.Button(self.right_frame, text="✕", fg="#f44336", **button_style)
+        view.register(self.up_btn, self, "up")
+        view.register(self.down_btn, self, "down")
+        view.register(self.delete_btn, self, "delete")
+        
+        self.item = view.canvas.create_window(0, 0, window=self.frame, anchor="nw", state="hidden")
+        view.register(self.frame, self, "frame")
+    
+    def make_signature(self, todo):
+        # Text的行数按宽度和字号算出，两者变了都要重设
+        return todo_signature(self.view.app.store, todo) + (self.view.text_width(), self.view.fonts.size)
+    
+    def set_data(self, todo, signature=None):
+        """把行换成显示todo"""
+        self.todo = todo
+        self.signature = signature or self.make_signature(todo)
+        bg = "#f9f9f9" if not todo.completed else "#e8e8e8"
+        
+        # 拖拽时的高亮样式也一并复原
+        self.frame.config(bg=bg, relief=tk.SOLID, bd=1, cursor="")
+        for widget in (self.left_frame, self.drag_label, self.check_btn, self.text_frame,
+                       self.time_label, self.right_frame, self.up_btn, self.down_btn,
+                       self.delete_btn):
+            widget.config(bg=bg)
+        self.check_var.set(todo.completed)
+        
+        display_text = display_text_of(todo)
+        task_text = self.task_text
+        task_text.config(state=tk.NORMAL, bg=bg,
+                         fg="#999" if todo.completed else "#333",
+                         font=self.view.fonts["text_done" if todo.completed else "text"],
+                         height=self.view.text_lines(todo))
+        task_text.delete("1.0", tk.END)
+        task_text.insert("1.0", display_text)
+        
+        # 标记超链接，点击时打开完整URL（不是截断的）
+        spans = link_spans(todo.text)
+        self.link_urls = [url for _, _, url in spans]
+        while self.link_tags < len(spans):
+            task_text.tag_config(f"link{self.link_tags}", foreground="#2196F3", underline=True)
+            self.link_tags += 1
+        for number, (start_pos, display_end, url) in enumerate(spans):
+            task_text.tag_add(f"link{number}", f"1.0+{start_pos}c", f"1.0+{display_end}c")
+        
+        # 禁用编辑
+        task_text.config(state=tk.DISABLED)
+        self.time_label.config(text=todo.created_at)
+        
+        # 任务在分组中的位置决定显示哪些移动按钮
+        has_up, has_down = self.signature[3:5]
+        for button in (self.up_btn, self.down_btn, self.delete_btn):
+            button.pack_forget()
+        if has_up:
+            self.up_btn.pack(side=tk.LEFT, padx=1)
+        if has_down:
+            self.down_btn.pack(side=tk.LEFT, padx=1)
+        self.delete_btn.pack(side=tk.LEFT, padx=1)
+    
+    def link_at(self, x, y):
+        """文本框内坐标(x, y)处字符所属超链接的完整URL，不在链接上时返回None"""
+        task_text = self.task_text
+        index = task_text.index(f"@{x},{y}")
+        bbox = task_text.bbox(index)
+        if not bbox or not (bbox[0] <= x < bbox[0] + bbox[2] and bbox[1] <= y < bbox[1] + bbox[3]):
+            return None
+        for tag in task_text.tag_names(index):
+            if tag.startswith("link"):
+                return self.link_urls[int(tag[4:])]
+        return None
+    
+    def highlight(self, on):
+        """拖拽时的黄色高亮"""
+        if on:
+            self.frame.config(relief=tk.RAISED, bd=4, bg="#ffeb3b", cursor="move")
+        else:
+            self.frame.config(relief=tk.SOLID, bd=1, bg=self.task_text["bg"], cursor="")
+    
+    @staticmethod
+    def estimate_height(view, todo):
+        """还没显示过的行按折行后的行数计算高度（边框和内边距按Tk默认值估算）"""
+        return view.text_lines(todo) * view.line_height("text") + view.line_height("time") + 20
+
+
+def wrap_segments(text, lines, spans):
+    """把折好的行按超链接切成片段：每行为[(文字, URL或None)]"""
+    result = []
+    for line_start, line_end in lines:
+        segments = []
+        position = line_start
+        for span_start, span_end, url in spans:
+            if span_end <= position or span_start >= line_end:
+                continue
+            if span_start > position:
+                segments.append((text[position:span_start], None))
+            segments.append((text[max(span_start, position):min(span_end, line_end)], url))
+            position = min(span_end, line_end)
+        if position < line_end:
+            segments.append((text[position:line_end], None))
+        result.append(segments)
+    return result
+
+
+class CanvasTodoRow(Row):
+    """直接画在Canvas上的任务行：只有图形项没有控件，点击由TodoListView按坐标分派"""
+    kind = "todo"
+    _tags = itertools.count()
+    
+    def __init__(self, view):
+        self.view = view
+        self.key = None
+        self.todo = None
+        self.tag = f"row{next(self._tags)}"
+        self.height = 0
+        self.dirty = True
+        self.links = {}   # 图形项id -> 完整URL
+        self.zones = []   # (左, 右, 动作)，动作为handle/check/text/up/down/delete
+        self.background = None
+    
+    def widget_count(self):
+        return 0
+    
+    def measure(self):
+        return self.height
+    
+    def make_signature(self, todo):
+        return todo_signature(self.view.app.store, todo)
+    
+    def set_data(self, todo, signature=None):
+        self.todo = todo
+        self.signature = signature or self.make_signature(todo)
+        self.dirty = True
+        if self.y is not None:
+            self.draw()
+    
+    def place(self, y, width):
+        if self.dirty or width != self.width:
+            self.y = y
+            self.width = width
+            self.draw()
+            return True
+        if y == self.y:
+            return False
+        self.view.canvas.move(self.tag, 0, y - self.y)
+        self.y = y
+        return True
+    
+    def hide(self):
+        self.y = self.width = None
+        self.dirty = True
+        self.view.canvas.delete(self.tag)
+    
+    def draw(self):
+        """按当前任务、位置和宽度重画整行，并把高度报告给列表"""
+        canvas = self.view.canvas
+        fonts = self.view.fonts
+        todo = self.todo
+        canvas.delete(self.tag)
+        self.links = {}
+        self.dirty = False
+        
+        left = ROW_PADX
+        right = self.width - ROW_PADX
+        top = self.y + ROW_PADY
+        bg = "#f9f9f9" if not todo.completed else "#e8e8e8"
+        self.background = canvas.create_rectangle(left, top, right, top, fill=bg,
+                                                  outline="#999", tags=(self.tag,))
+        
+        # 右侧按钮从右往左排，和控件画法一样只在能移动时显示↑↓
+        has_up, has_down = self.signature[3:]
+        buttons = [("delete", "✕", "#f44336")]
+        if has_down:
+            buttons.append(("down", "↓", "#2196F3"))
+        if has_up:
+            buttons.append(("up", "↑", "#2196F3"))
+        self.zones = [(left, left + 26, "handle"), (left + 26, left + 50, "check")]
+        x = right - 4
+        button_items = []
+        for action, glyph, color in buttons:
+            glyph_width = fonts["button"].measure(glyph) + 8
+            self.zones.append((x - glyph_width, x, action))
+            button_items.append((x - glyph_width / 2, glyph, color))
+            x -= glyph_width
+        
+        # 文本按像素宽度折行（与估算高度用同一份缓存），超链接单独成段以便着色和点击
+        text_left = left + TEXT_LEFT
+        view = self.view
+        self.zones.append((text_left, x, "text"))
+        display_text = display_text_of(todo)
+        spans = link_spans(todo.text)
+        lines = view.measurer.lines(display_text, view.text_width(), fonts["text"])[:MAX_LINES]
+        text_font = fonts["text_done" if todo.completed else "text"]
+        link_font = fonts["link_done" if todo.completed else "link"]
+        line_height = view.line_height("text")
+        y = top + 6
+        for segments in wrap_segments(display_text, lines, spans):
+            x = text_left
+            for segment, url in segments:
+                item = canvas.create_text(x, y, text=segment, anchor="nw",
+                                          font=link_font if url else text_font,
+                                          fill="#2196F3" if url else ("#999" if todo.completed else "#333"),
+                                          tags=(self.tag,))
+                if url:
+                    self.links[item] = url
+                x += text_font.measure(segment)
+            y += line_height
+        canvas.create_text(text_left, y, text=todo.created_at, anchor="nw",
+                           font=fonts["time"], fill="#aaa", tags=(self.tag,))
+        y += view.line_height("time") + 6
+        self.height = y - top
+        canvas.coords(self.background, left, top, right, y)
+        
+        # 左右两侧的图标垂直居中
+        middle = (top + y) / 2
+        canvas.create_text(left + 13, middle, text="☰", font=fonts["glyph"], fill="#999",
+                           tags=(self.tag,))
+        canvas.create_text(left + 38, middle, text="☑" if todo.completed else "☐",
+                           font=fonts["glyph"], fill="#333", tags=(self.tag,))
+        for center, glyph, color in button_items:
+            canvas.create_text(center, middle, text=glyph, font=fonts["button"], fill=color,
+                               tags=(self.tag,))
+        view.row_resized(self, self.height)
+    
+    @staticmethod
+    def estimate_height(view, todo):
+        """与draw的排列完全一致，所以没画过的行高度也是准的"""
+        return view.text_lines(todo) * view.line_height("text") + view.line_height("time") + 12
+    
+    def hit(self, x, y):
+        """坐标(x, y)处的动作：超链接返回("link", url)，其余返回区域名，不在行内时返回None"""
+        if self.y is None or not self.y + ROW_PADY <= y <= self.y + ROW_PADY + self.height:
+            return None
+        for item in self.view.canvas.find_overlapping(x, y, x, y):
+            if item in self.links:
+                return ("link", self.links[item])
+        for zone_left, zone_right, action in self.zones:
+            if zone_left <= x < zone_right:
+                return action
+        return None
+    
+    def highlight(self, on):
+        if self.background is not None:
+            bg = "#f9f9f9" if not self.todo.completed else "#e8e8e8"
+            self.view.canvas.itemconfigure(self.background, fill="#ffeb3b" if on else bg,
+                                           width=3 if on else 1)
+
+
+class ArchivedRow(Row):
+    """已归档任务的只读行"""
+    kind = "archived"
+    
+    def __init__(self, view):
+        self.view = view
+        self.key = None
+        self.todo = None
+        self.frame = tk.Frame(view.canvas, bg="#eeeeee", relief=tk.SOLID, bd=1)
+        self.text_label = tk.Label(self.frame,
+                                   font=view.fonts["text_done"],
+                                   fg="#999", bg="#eeeeee",
+                                   anchor="w", justify=tk.LEFT)
+        self.text_label.pack(fill=tk.X, padx=10, pady=(5, 0))
+        self.time_label = tk.Label(self.frame,
+                                   font=view.fonts["time"],
+                                   fg="#aaa", bg="#eeeeee",
+                                   anchor="w")
+        self.time_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+        self.item = view.canvas.create_window(0, 0, window=self.frame, anchor="nw", state="hidden")
+        view.register(self.frame, self, "frame")
+    
+    def make_signature(self, todo):
+        return (todo.text, todo.created, self.view.width)
+    
+    def set_data(self, todo, signature=None):
+        self.todo = todo
+        self.signature = signature or self.make_signature(todo)
+        self.text_label.config(text=display_text_of(todo),
+                               wraplength=max(self.view.width - 40, 100))
+        self.time_label.config(text=f"📦 {todo.created_at}")
+        self.highlight(False)
+    
+    def highlight(self, on):
+        """搜索跳转时的高亮"""
+        bg = "#fff59d" if on else "#eeeeee"
+        for widget in (self.frame, self.text_label, self.time_label):
+            widget.config(bg=bg)
+    
+    @staticmethod
+    def estimate_height(view, todo):
+        lines = view.measurer.lines(display_text_of(todo), max(view.width - 40, 100), view.fonts["text"])
+        return len(lines) * view.line_height("text") + view.line_height("time") + 14
+
+
+class TodoListView:
+    """在Canvas中按需创建、复用任务行"""
+    def __init__(self, app, canvas, scrollbar, fonts, renderer="widgets", buffer_rows=5):
+        self.app = app
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.renderer = "canvas" if renderer == "canvas" else "widgets"
+        # 已归档任务只读且数量少，两种画法都用控件行
+        self.row_types = {"todo": CanvasTodoRow if self.renderer == "canvas" else TodoRow,
+                          "archived": ArchivedRow}
+        self.fonts = fonts
+        fonts.listeners.append(self.reset_layout)
+        self.measurer = LineMeasurer()
+        self._line_heights = {}  # 字体名 -> 行高
+        self._text_width = None  # 任务行中文本区的宽度
+        self.buffer_rows = buffer_rows  # 视口上下额外保留的行数
+        self.entries = []      # (类型, 任务)，按显示顺序
+        self.offsets = [0]     # 每行顶部的y坐标，最后一项为全部行的总高度
+        self.heights = {}      # (类型, id) -> 测量到的行高（含间距）
+        self.visible = {}      # (类型, id) -> 正在显示的行
+        self.pools = {kind: [] for kind in self.row_types}  # 空闲的行
+        # 累计的操作计数：新建控件数、新取用/重绘/移动/回收的行数
+        self.counters = {"widgets": 0, "acquired": 0, "restyled": 0, "moved": 0, "released": 0}
+        self.width = max(canvas.winfo_width(), 1)
+        self.drag_key = None   # 正在拖拽的行，滚出视口也不回收（它持有鼠标）
+        self.ghost = None      # 拖拽时跟随鼠标的浮动行
+        self._update_pending = False
+        self._measure_pending = False
+        self._offsets_dirty = False
+        self.layout_deferred = False  # 调整窗口大小期间暂不按新宽度重排
+        self._pending_width = None
+        
+        # 列表末尾的提示文字和"加载已归档任务"按钮
+        self.footer = tk.Frame(canvas, bg="white")
+        self.message_label = tk.Label(self.footer, font=("微软雅黑", 12),
+                                      fg="#999", bg="white", pady=50)
+        self.more_button = tk.Button(self.footer, font=("微软雅黑", 9), fg="#666",
+                                     bg="white", relief=tk.FLAT, cursor="hand2")
+        self.footer_item = canvas.create_window(0, 0, window=self.footer, anchor="nw")
+        self.footer.bind("<Configure>", lambda e: self.schedule_update())
+        
+        canvas.config(yscrollcommand=self.on_yview)
+        canvas.bind("<Configure>", self.on_canvas_configure)
+        
+        # 行内的点击、拖拽和双击都由列表分派，每行不注册任何回调：
+        # canvas画法按坐标判断，控件画法按控件登记的(行, 动作)判断
+        self.drag_row = None
+        self.targets = {}  # 控件路径 -> (行, 动作)
+        if self.renderer == "canvas":
+            canvas.bind("<Button-1>", self.on_click)
+            canvas.bind("<B1-Motion>", self.on_click_motion)
+            canvas.bind("<ButtonRelease-1>", self.on_click_release)
+            canvas.bind("<Double-Button-1>", self.on_double_click)
+        else:
+            canvas.bind_class(ROW_TAG, "<Button-1>", self.on_row_press)
+            canvas.bind_class(ROW_TAG, "<B1-Motion>", self.on_click_motion)
+            canvas.bind_class(ROW_TAG, "<ButtonRelease-1>", self.on_row_release)
+        canvas.bind_class(ROW_TAG, "<Double-Button-1>", self.on_row_double_click)
+        canvas.bind_class(ROW_TAG, "<Configure>", self.on_row_configure)
+    
+    def set_entries(self, entries):
+        """换成新的行列表；已显示的行按(类型, id)保留，由update_visible只做必要的改动"""
+        self.entries = entries
+        keys = {(kind, todo.id) for kind, todo in entries}
+        self.measurer.fit(2 * len(entries))
+        self.heights = {key: height for key, height in self.heights.items() if key in keys}
+        self._rebuild_offsets()
+        self.update_visible()
+    
+    def set_footer(self, message="", button_text="", command=None):
+        """设置列表末尾的提示文字和按钮（为空时不显示）"""
+        self.message_label.pack_forget()
+        self.more_button.pack_forget()
+        if message:
+            self.message_label.config(text=message)
+            self.message_label.pack()
+        if button_text:
+            self.more_button.config(text=button_text, command=command)
+            self.more_button.pack(fill=tk.X, padx=5, pady=5)
+        self.schedule_update()
+    
+    def _rebuild_offsets(self):
+        self._offsets_dirty = False
+        offsets = [0]
+        y = 0
+        for kind, todo in self.entries:
+            height = self.heights.get((kind, todo.id))
+            if height is None:
+                height = self.row_types[kind].estimate_height(self, todo) + 2 * ROW_PADY
+            y += height
+            offsets.append(y)
+        self.offsets = offsets
+    
+    def line_height(self, name):
+        """字体的行高"""
+        height = self._line_heights.get(name)
+        if height is None:
+            height = self._line_heights[name] = self.fonts[name].metrics("linespace")
+        return height
+    
+    def text_width(self):
+        """任务行中文本区的宽度：右侧按三个按钮都显示时留出空间，折行不随按钮变化"""
+        if self._text_width is None:
+            buttons = sum(self.fonts["button"].measure(glyph) + 8 for glyph in "↑↓✕")
+            self._text_width = max(self.width - 2 * ROW_PADX - TEXT_LEFT - buttons - 8, 40)
+        return self._text_width
+    
+    def text_lines(self, todo):
+        """任务文本折行后显示的行数（最多MAX_LINES行）"""
+        lines = self.measurer.lines(display_text_of(todo), self.text_width(), self.fonts["text"])
+        return min(len(lines), MAX_LINES)
+    
+    def reset_layout(self):
+        """宽度或字体变化后，折行、行高和文本区宽度全部重新计算；已显示的行原地重排，不重建"""
+        self.measurer.clear()
+        self._line_heights.clear()
+        self._text_width = None
+        self.heights.clear()
+        for row in self.visible.values():
+            row.width = None
+        self._rebuild_offsets()
+        self._schedule_measure()
+        self.schedule_update()
+    
+    def index_at(self, y):
+        """Canvas坐标y处的行位置（超出范围时取最近的一行），没有行时返回-1"""
+        if not self.entries:
+            return -1
+        if self._offsets_dirty:
+            self._rebuild_offsets()
+        position = bisect.bisect_right(self.offsets, y) - 1
+        return min(max(position, 0), len(self.entries) - 1)
+    
+    def schedule_update(self):
+        """合并同一轮事件中的多次更新"""
+        if not self._update_pending:
+            self._update_pending = True
+            self.canvas.after_idle(self.update_visible)
+    
+    def update_visible(self):
+        """只让视口及缓冲区内的行存在，其余的放回对象池"""
+        self._update_pending = False
+        if self._offsets_dirty:
+            self._rebuild_offsets()
+        canvas = self.canvas
+        top = canvas.canvasy(0)
+        bottom = top + canvas.winfo_height()
+        first = max(self.index_at(top) - self.buffer_rows, 0)
+        last = min(self.index_at(bottom) + self.buffer_rows, len(self.entries) - 1)
+        
+        # 不再显示的行先回收，空出的行供新进入视口的任务使用
+        wanted = {(kind, todo.id) for kind, todo in self.entries[first:last + 1]}
+        wanted.add(self.drag_key)
+        for key in list(self.visible):
+            if key not in wanted:
+                self._release(key)
+        counters = self.counters
+        for position in range(first, last + 1):
+            kind, todo = self.entries[position]
+            row = self.visible.get((kind, todo.id))
+            if row is None:
+                row = self._acquire(kind, todo)
+            else:
+                signature = row.make_signature(todo)
+                if signature != row.signature:
+                    row.set_data(todo, signature)
+                    counters["restyled"] += 1
+                    if row.key not in self.heights:
+                        self._schedule_measure()
+            if row.place(self.offsets[position], self.width):
+                counters["moved"] += 1
+        
+        total = self.offsets[-1]
+        canvas.coords(self.footer_item, 0, total)
+        canvas.itemconfigure(self.footer_item, width=self.width)
+        height = total + self.footer.winfo_reqheight()
+        region = (0, 0, self.width, max(height, canvas.winfo_height()))
+        if tuple(float(v) for v in canvas.cget("scrollregion").split()) != region:
+            canvas.config(scrollregion=region)
+    
+    def _acquire(self, kind, todo):
+        pool = self.pools[kind]
+        if pool:
+            row = pool.pop()
+        else:
+            row = self.row_types[kind](self)
+            self.counters["widgets"] += row.widget_count()
+        self.counters["acquired"] += 1
+        row.key = (kind, todo.id)
+        row.set_data(todo)
+        self.visible[row.key] = row
+        if row.key not in self.heights:
+            self._schedule_measure()
+        return row
+    
+    def _schedule_measure(self):
+        """复用的行高度不变时不会收到<Configure>，等布局算完后主动测量一次"""
+        if not self._measure_pending:
+            self._measure_pending = True
+            self.canvas.after_idle(self._measure_visible)
+    
+    def _measure_visible(self):
+        self._measure_pending = False
+        for row in list(self.visible.values()):
+            if row.key not in self.heights:
+                self.row_resized(row, row.measure())
+    
+    def _release(self, key):
+        row = self.visible.pop(key)
+        row.hide()
+        row.key = None
+        row.signature = None
+        self.counters["released"] += 1
+        self.pools[row.kind].append(row)
+    
+    def row_resized(self, row, height):
+        """行的实际高度与缓存不同时更新偏移（下一次空闲时重新排列）"""
+        if row.key is None:
+            return
+        height += 2 * ROW_PADY
+        if self.heights.get(row.key) == height:
+            return
+        self.heights[row.key] = height
+        # 同一轮中多行改变高度时只重算一次偏移
+        self._offsets_dirty = True
+        self.schedule_update()
+    
+    def on_yview(self, first, last):
+        """Canvas视图变化（滚动、滚动区域改变）时同步滚动条并更新可见行"""
+        self.scrollbar.set(first, last)
+        self.schedule_update()
+    
+    def on_canvas_configure(self, event):
+        """宽度变化后换行不同，缓存的折行和行高全部作废"""
+        if self.layout_deferred:
+            # 只记下最新宽度，行保持原来的折行，露出的部分由可见范围的更新补齐
+            self._pending_width = event.width
+        elif event.width != self.width:
+            self.width = event.width
+            self.reset_layout()
+        self.schedule_update()
+    
+    def defer_layout(self, deferred):
+        """暂缓/恢复按新宽度重排；恢复时若宽度变过，只重排一次"""
+        self.layout_deferred = deferred
+        if deferred:
+            return
+        width, self._pending_width = self._pending_width, None
+        if width is not None and width != self.width:
+            self.width = width
+            self.reset_layout()
+    
+    def row_at(self, event):
+        """Canvas画法下事件所在的任务行及其Canvas坐标"""
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        position = self.index_at(y)
+        if position < 0:
+            return None, x, y
+        kind, todo = self.entries[position]
+        return self.visible.get((kind, todo.id)), x, y
+    
+    def on_click(self, event):
+        """Canvas画法的单击：按坐标判断点中了哪一行的哪个区域"""
+        row, x, y = self.row_at(event)
+        if not isinstance(row, CanvasTodoRow):
+            return
+        action = row.hit(x, y)
+        if isinstance(action, tuple):
+            webbrowser.open(action[1])
+        elif action == "handle":
+            self.drag_row = row
+            self.app.start_drag_task(event, row, row.todo.id)
+        else:
+            self.run_action(row, action)
+    
+    def run_action(self, row, action):
+        """执行行上按钮对应的操作（两种画法共用）"""
+        app = self.app
+        todo_id = row.todo.id
+        if action == "check":
+            app.toggle_task(todo_id)
+        elif action == "up":
+            app.move_task_up(todo_id)
+        elif action == "down":
+            app.move_task_down(todo_id)
+        elif action == "delete":
+            app.delete_task(todo_id)
+    
+    def register(self, widget, row, action):
+        """控件画法：把控件的事件交给列表分派（在类绑定之后、窗口绑定之前插入共用的标签）"""
+        tags = widget.bindtags()
+        widget.bindtags(tags[:2] + (ROW_TAG,) + tags[2:])
+        self.targets[str(widget)] = (row, action)
+    
+    def target_of(self, event):
+        """事件所在控件登记的(行, 动作)；行已回收（没有任务）时返回(None, None)"""
+        row, action = self.targets.get(str(event.widget), (None, None))
+        if row is None or row.todo is None:
+            return None, None
+        return row, action
+    
+    def on_row_press(self, event):
+        row, action = self.target_of(event)
+        if action == "handle":
+            self.drag_row = row
+            self.app.start_drag_task(event, row, row.todo.id)
+        elif action == "text":
+            url = row.link_at(event.x, event.y)
+            if url:
+                webbrowser.open(url)
+    
+    def on_row_release(self, event):
+        """拖拽结束，或按钮上松开鼠标（和Button的command一样，移出按钮后松开不算）"""
+        if self.drag_row is not None:
+            self.on_click_release(event)
+            return
+        row, action = self.target_of(event)
+        widget = event.widget
+        if action in ("check", "up", "down", "delete") and \
+                0 <= event.x < widget.winfo_width() and 0 <= event.y < widget.winfo_height():
+            self.run_action(row, action)
+    
+    def on_row_double_click(self, event):
+        row, action = self.target_of(event)
+        if action == "text":
+            self.app.edit_task(row.todo.id)
+    
+    def on_row_configure(self, event):
+        row, action = self.targets.get(str(event.widget), (None, None))
+        if action == "frame":
+            row.on_configure(event)
+    
+    def on_click_motion(self, event):
+        if self.drag_row is not None:
+            self.app.on_drag_task(event, self.drag_row)
+    
+    def on_click_release(self, event):
+        row = self.drag_row
+        if row is not None:
+            self.drag_row = None
+            self.app.stop_drag_task(event, row, row.todo.id)
+    
+    def on_double_click(self, event):
+        row, x, y = self.row_at(event)
+        if isinstance(row, CanvasTodoRow) and row.hit(x, y) == "text":
+            self.app.edit_task(row.todo.id)
+    
+    def reveal(self, kind, todo_id):
+        """滚动到指定的行（尽量居中）并短暂高亮，返回是否找到"""
+        key = (kind, todo_id)
+        for position, (entry_kind, todo) in enumerate(self.entries):
+            if entry_kind == kind and todo.id == todo_id:
+                break
+        else:
+            return False
+        if self._offsets_dirty:
+            self._rebuild_offsets()
+        self.update_visible()
+        region_height = float(self.canvas.cget("scrollregion").split()[3])
+        row_top = self.offsets[position]
+        row_height = self.offsets[position + 1] - row_top
+        target = row_top - (self.canvas.winfo_height() - row_height) / 2
+        self.canvas.yview_moveto(max(target, 0) / region_height)
+        self.update_visible()
+        row = self.visible.get(key)
+        if row is not None:
+            row.highlight(True)
+            # 行可能已被回收给别的任务，那时set_data已复原样式
+            self.canvas.after(1200, lambda: row.key == key and row.highlight(False))
+        return True
+    
+    def show_ghost(self, todo, y):
+        """显示拖拽时跟随鼠标的浮动行（一个复用的Label窗口项，总在其他行之上）"""
+        if self.ghost is None:
+            self.ghost = tk.Label(self.canvas, font=self.fonts["text"], bg="#fff59d", fg="#333",
+                                  relief=tk.RAISED, bd=2, anchor="w", padx=10, pady=6)
+            self.ghost_item = self.canvas.create_window(0, 0, window=self.ghost, anchor="w")
+        text = display_text_of(todo).split("\n")[0]
+        self.ghost.config(text="☰  " + (text[:40] + "…" if len(text) > 40 else text))
+        self.canvas.itemconfigure(self.ghost_item, state="normal", width=self.width - 4 * ROW_PADX)
+        self.ghost.lift()
+        self.move_ghost(y)
+    
+    def move_ghost(self, y):
+        self.canvas.coords(self.ghost_item, 2 * ROW_PADX, y)
+    
+    def hide_ghost(self):
+        if self.ghost is not None:
+            self.canvas.itemconfigure(self.ghost_item, state="hidden")